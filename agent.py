@@ -1,14 +1,19 @@
 
+import os
 import json
-from typing import Dict, Any, List
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Iterator
 import ollama
 
 from tools.wiki import search_wiki
 from tools.web import fetch_url
 from tools.calc import calculator
+from rag.query_cache import LRUCache, read_version, normalize_query
+from rag.vectors import VectorIndex
+from rag.context import compact_context, format_context
+from router import Router, rule_route
 
 SYSTEM_HINT = """You are a helpful domain-aware assistant.
 You may use ONE optional tool BEFORE answering:
@@ -29,24 +34,157 @@ def call_llm(prompt: str, model: str = "mistral:7b") -> str:
                                            {"role":"user","content":prompt}])
     return r["message"]["content"]
 
+def call_llm_stream(prompt: str, model: str = "mistral:7b") -> Iterator[str]:
+    """call_llm, yielding the reply piece by piece as the model generates it."""
+    for chunk in ollama.chat(model=model, messages=[{"role":"system","content":SYSTEM_HINT},
+                                                    {"role":"user","content":prompt}], stream=True):
+        text = chunk["message"]["content"]
+        if text:
+            yield text
+
+# --- Shared, lazily loaded encoder and collection ---
+# chromadb and sentence-transformers (torch) are imported on first use, and each model / database path is loaded
+# once per process and shared by every Retriever, so queries that never search pay nothing.
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+_shared, _shared_lock = {}, threading.Lock()
+
+def _load_shared(key, factory):
+    with _shared_lock:
+        entry = _shared.setdefault(key, {"lock": threading.Lock(), "value": None})
+    with entry["lock"]:  # per key, so the model and the database load in parallel
+        if entry["value"] is None:
+            entry["value"] = factory()
+    return entry["value"]
+
+def _load_encoder(model_name: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+def _load_client(persist_dir: str):
+    import chromadb
+    from chromadb.config import Settings
+    return chromadb.PersistentClient(path=persist_dir, settings=Settings(allow_reset=True))
+
+def get_encoder(model_name: str = EMBED_MODEL):
+    return _load_shared(("encoder", model_name), lambda: _load_encoder(model_name))
+
+def get_client(persist_dir: str = "./db"):
+    path = os.path.abspath(persist_dir)
+    return _load_shared(("client", path), lambda: _load_client(path))
+
+def get_collection(persist_dir: str = "./db", name: str = "docs"):
+    path = os.path.abspath(persist_dir)
+    return _load_shared(("collection", path, name), lambda: get_client(path).get_or_create_collection(name))
+
+def get_vector_index(persist_dir: str = "./db", version: str | None = None):
+    """The compact store written by `rag.ingest --vector_store compact|both`, reloaded when the collection version changes."""
+    path = os.path.abspath(persist_dir)
+    version = read_version(path) if version is None else version
+    with _shared_lock:  # drop indexes of older versions
+        for key in [key for key in _shared if key[:2] == ("vector_index", path) and key[2] != version]:
+            del _shared[key]
+    return _load_shared(("vector_index", path, version), lambda: VectorIndex(os.path.join(path, "vectors")))
+
+def get_embedding_cache(model_name: str = EMBED_MODEL, max_entries: int = 2048):
+    return _load_shared(("embedding_cache", model_name), lambda: LRUCache(max_entries))
+
+def get_result_cache(persist_dir: str = "./db", max_entries: int = 512):
+    return _load_shared(("result_cache", os.path.abspath(persist_dir)), lambda: LRUCache(max_entries))
+
 class Retriever:
-    def __init__(self, persist_dir="./db"):
-        self.client = chromadb.PersistentClient(path=persist_dir, settings=Settings(allow_reset=True))
-        self.col = self.client.get_or_create_collection("docs")
-        self.encoder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+    BACKENDS = ("chroma", "numpy")
 
-    def search(self, query: str, k: int = 4):
+    def __init__(self, persist_dir="./db", model_name: str = EMBED_MODEL, warmup: bool = False, backend: str = "chroma"):
+        """backend "numpy" searches the memory-mapped compact store in memory instead of going through Chroma."""
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown retrieval backend {backend!r}; choose from {self.BACKENDS}")
+        self.persist_dir, self.model_name, self.backend = persist_dir, model_name, backend
+        # shared per model / database, like the encoder and collection; results are keyed by the collection
+        # version that ingestion bumps, so stale entries are never returned
+        self.embedding_cache, self.result_cache = get_embedding_cache(model_name), get_result_cache(persist_dir)
+        if warmup:
+            self.warmup()
+
+    @property
+    def client(self):
+        return get_client(self.persist_dir)
+
+    @property
+    def col(self):
+        return get_collection(self.persist_dir)
+
+    @property
+    def encoder(self):
+        return get_encoder(self.model_name)
+
+    def warmup(self, background: bool = True):
+        """Loads the collection and encoder (and runs one encode) ahead of the first search; returns the thread."""
+        def load():
+            try:
+                if self.backend == "numpy":
+                    get_vector_index(self.persist_dir)
+                else:
+                    self.col.count()
+                self.encoder.encode(["warmup"], normalize_embeddings=True)
+            except Exception as e:
+                print(f"[WARN] Retriever warmup failed: {e}")
+        if not background:
+            load()
+            return None
+        thread = threading.Thread(target=load, name="retriever-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def embed_queries(self, queries: List[str]):
+        # the normalized text is both the cache key and what gets encoded, so equal keys mean equal embeddings
+        keys = [normalize_query(q) for q in queries]
+        embs = [self.embedding_cache.get(key) for key in keys]
+        missing = [i for i, e in enumerate(embs) if e is None]
+        if missing:
+            encoded = self.encoder.encode([keys[i] for i in missing], normalize_embeddings=True).tolist()
+            for i, e in zip(missing, encoded):
+                self.embedding_cache.put(keys[i], e)
+                embs[i] = e
+        return embs
+
+    def embed_query(self, query: str):
+        return self.embed_queries([query])[0]
+
+    def _search_embeddings(self, embs: list, k: int):
+        if self.backend == "numpy":
+            index = get_vector_index(self.persist_dir)
+            return [[{"text": index.rows[i]["text"], "source": index.rows[i].get("source", "unknown")} for i, _ in hits]
+                    for hits in index.search_many(embs, k)]
         if self.col.count() == 0:
-            return []
-        q = self.encoder.encode([query], normalize_embeddings=True).tolist()[0]
-        res = self.col.query(query_embeddings=[q], n_results=k, include=["documents","metadatas"])
-        docs = res.get("documents", [[]])[0]
-        metas = res.get("metadatas", [[]])[0]
-        items = []
-        for d, m in zip(docs, metas):
-            src = m.get("source","unknown")
-            items.append({"text": d, "source": src})
-        return items
+            return [[] for _ in embs]
+        res = self.col.query(query_embeddings=embs, n_results=k, include=["documents","metadatas"])
+        results = []
+        for docs, metas in zip(res.get("documents") or [[]], res.get("metadatas") or [[]]):
+            items = []
+            for d, m in zip(docs, metas):
+                src = m.get("source","unknown")
+                items.append({"text": d, "source": src})
+            results.append(items)
+        return results
+
+    def search_many(self, queries: List[str], k: int = 4):
+        """search() for several queries at once: one encoder batch and one vector query for all cache misses."""
+        version = read_version(self.persist_dir)
+        keys = [(normalize_query(q), k, self.backend, version) for q in queries]
+        results = [self.result_cache.get(key) for key in keys]
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            found = self._search_embeddings(self.embed_queries([queries[i] for i in missing]), k)
+            for i, items in zip(missing, found):
+                self.result_cache.put(keys[i], items)
+                results[i] = items
+        return [[dict(item) for item in items] for items in results]
+
+    def search(self, query: str, k: int = 4):
+        return self.search_many([query], k)[0]
+
+    def cache_stats(self):
+        return {"embeddings": self.embedding_cache.stats(), "results": self.result_cache.stats()}
 
 def plan(query: str) -> Dict[str, str]:
     p = f"""User query: {query}
@@ -64,19 +202,99 @@ First, decide ONE tool that would help most (or "none"). Output ONLY the JSON, n
     except Exception:
         return {"tool":"none","args":"","reason":"parse-failed"}
 
-def run(query: str, retriever: Retriever, model: str = "mistral:7b") -> Dict[str, Any]:
-    decision = plan(query)
+default_router = Router()
+
+# --- Speculative tool execution ---
+SPECULATION_WORKERS = 4
+_speculation_pool, _speculation_lock, _speculation_running = None, threading.Lock(), 0
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+def _speculation_finished(_future):
+    global _speculation_running
+    with _speculation_lock:
+        _speculation_running -= 1
+
+class Speculation:
+    """
+    Cheap tools started on the raw query while the planner is still deciding: a local search and a Wikipedia lookup.
+    take() hands over the result matching the final decision; discard() cancels or abandons the rest.
+    A task only starts when a speculation worker is free, so lookups abandoned by earlier queries never queue up
+    in front of new ones, and take() waits at most until `max_seconds` after the start before the tool runs inline.
+    """
+
+    def __init__(self, query: str, retriever: Retriever | None, max_seconds: float = 10.0):
+        global _speculation_pool
+        with _speculation_lock:
+            if _speculation_pool is None:
+                _speculation_pool = ThreadPoolExecutor(max_workers=SPECULATION_WORKERS, thread_name_prefix="speculate")
+        self.query, self.started, self.used = query, time.perf_counter(), None
+        self.deadline = self.started + max_seconds
+        self.tasks = {}
+        self._start("wiki", search_wiki, query)
+        if retriever is not None:
+            self._start("vector_search", retriever.search, query, 4)
+
+    def _start(self, tool: str, fn, *args):
+        global _speculation_running
+        with _speculation_lock:
+            if _speculation_running >= SPECULATION_WORKERS:
+                return  # every worker is busy, possibly with abandoned work: skip rather than queue
+            _speculation_running += 1
+        future = _speculation_pool.submit(_timed, fn, *args)
+        future.add_done_callback(_speculation_finished)
+        self.tasks[tool] = future
+
+    def take(self, tool: str, args: str):
+        """
+        The prefetched result for `tool`, or None (the caller then runs the tool itself) if it was not started,
+        ran on other args, failed, had not started yet, or is still running at the deadline.
+        """
+        future = self.tasks.get(tool)
+        if future is None or (tool == "wiki" and args not in ("", self.query)):
+            return None
+        if future.cancel():  # still queued: running it inline is no slower than waiting for a worker
+            return None
+        try:
+            value, _ = future.result(timeout=max(0.0, self.deadline - time.perf_counter()))
+        except Exception:  # failed, or too slow (TimeoutError)
+            return None
+        self.used = tool
+        return value
+
+    def discard(self):
+        """Cancels unused tasks that have not started; returns a report of the work reused and the work wasted."""
+        wasted = 0.0
+        for tool, future in self.tasks.items():
+            if tool == self.used:
+                continue
+            if future.cancelled() or future.cancel():
+                continue
+            if future.done() and future.exception() is None:
+                wasted += future.result()[1]
+            else:  # still running (or failed); it finishes in the background and is ignored
+                wasted += time.perf_counter() - self.started
+        reused = self.tasks[self.used].result()[1] if self.used else 0.0  # tool time that overlapped the planning
+        return {"started": list(self.tasks), "used": self.used, "reused_seconds": reused, "wasted_seconds": wasted}
+
+def run_tool(decision: Dict[str, str], query: str, retriever: Retriever, context_tokens: int = 1500,
+             speculation: Speculation | None = None):
+    """Runs the tool `decision` names, reusing a matching speculative result; returns (result text, sources)."""
     tool_used = decision["tool"]
     result = ""
     sources = []
+    prefetched = speculation.take(tool_used, decision.get("args", "")) if speculation else None
 
     if tool_used == "vector_search":
-        hits = retriever.search(query, k=4)
-        result = "\n\n".join([f"[{i+1}] ({h['source']})\n{h['text']}" for i,h in enumerate(hits)]) or "No local results."
+        hits = prefetched if prefetched is not None else retriever.search(query, k=4)
+        hits = compact_context(hits, max_tokens=context_tokens)
+        result = format_context(hits) or "No local results."
         sources = list({h["source"] for h in hits})
     elif tool_used == "wiki":
         target = decision["args"] or query
-        result = search_wiki(target)
+        result = prefetched if prefetched is not None else search_wiki(target)
     elif tool_used == "web":
         url = decision["args"]
         result = fetch_url(url) if url else "[error] No URL provided."
@@ -85,6 +303,29 @@ def run(query: str, retriever: Retriever, model: str = "mistral:7b") -> Dict[str
         result = calculator(decision["args"])
     else:
         result = "(No tool used.)"
+    return result, sources
+
+def run_stream(query: str, retriever: Retriever, model: str = "mistral:7b", context_tokens: int = 1500,
+               router: Router | None = default_router, speculative: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    run() as a stream of events: {"type": "plan", ...decision}, {"type": "tool", "tool", "result", "sources"},
+    one {"type": "token", "text"} per piece of the answer as the model generates it, and finally
+    {"type": "answer", "tool", "answer", "sources", "route", "first_token_seconds", "seconds", "timings",
+    "speculation"}; "timings" has per-stage seconds (plan, tool, first_token, answer).
+    `router` picks obvious tools without the planning LLM call; pass None to always call plan().
+    `speculative` starts a local search and a Wikipedia lookup on the raw query while the tool is being chosen
+    (not for queries a routing rule answers outright); the one the decision matches is reused, the other discarded.
+    """
+    started = time.perf_counter()
+    speculation = Speculation(query, retriever) if speculative and rule_route(query) is None else None
+    decision = router.route(query, retriever, plan) if router is not None else plan(query)
+    timings = {"plan": time.perf_counter() - started}
+    yield {"type": "plan", **decision}
+    tool_used = decision["tool"]
+    result, sources = run_tool(decision, query, retriever, context_tokens, speculation)
+    report = speculation.discard() if speculation else None
+    timings["tool"] = time.perf_counter() - started - timings["plan"]
+    yield {"type": "tool", "tool": tool_used, "result": result, "sources": sources}
 
     final_prompt = f"""User question: {query}
 
@@ -94,10 +335,26 @@ TOOL_RESULTS:
 {result}
 
 Now write the FINAL ANSWER in markdown, with a brief explanation and a bullet list of sources (if any)."""
-    answer = call_llm(final_prompt, model=model)
-    return {"tool": tool_used, "answer": answer, "sources": sources}
+    parts, first_token, answer_started = [], None, time.perf_counter()
+    for text in call_llm_stream(final_prompt, model=model):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+            timings["first_token"] = time.perf_counter() - answer_started
+        parts.append(text)
+        yield {"type": "token", "text": text}
+    timings["answer"] = time.perf_counter() - answer_started
+    yield {"type": "answer", "tool": tool_used, "answer": "".join(parts), "sources": sources,
+           "route": decision.get("route", "planner"), "first_token_seconds": first_token,
+           "seconds": time.perf_counter() - started, "timings": timings, "speculation": report}
+
+def run(query: str, retriever: Retriever, model: str = "mistral:7b", context_tokens: int = 1500,
+        router: Router | None = default_router, speculative: bool = False) -> Dict[str, Any]:
+    for event in run_stream(query, retriever, model=model, context_tokens=context_tokens, router=router,
+                            speculative=speculative):
+        if event["type"] == "answer":
+            return {k: event[k] for k in ("tool", "answer", "sources", "route")}
 
 if __name__ == "__main__":
-    r = Retriever("./db")
+    r = Retriever("./db", warmup=True)
     out = run("Summarize the topic in our local knowledge and add 2 facts from Wikipedia about it.", r)
     print(out["answer"])
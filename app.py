@@ -1,64 +1,89 @@
 # app.py (FINAL SUBMISSION VERSION)
 import gradio as gr
-import subprocess
-import json
 import os
-import datetime
-from collections import defaultdict
+import time
+from functools import partial
 from dotenv import load_dotenv
+from monitor import run_monitor
+from monitoring.digest import DigestState
+from monitoring.runner import MonitorRunner, format_event
+from agent import Retriever, run_stream
 
 # --- Load Environment Variables and Config ---
 load_dotenv()
 LOG_FILE = "summary_log.jsonl"
+SUMMARY_DB = "summary_log.db"
 CONFIG_FILE = "competitors.json"
-PYTHON_EXECUTABLE = ".\\.venv\\Scripts\\python.exe"
+SNAPSHOT_DIR = "./snapshots"
+DB_DIR = "./db"
 
 # --- Functions ---
+digest_state = DigestState(CONFIG_FILE, LOG_FILE, db_path=SUMMARY_DB)
+
 def load_and_format_digest():
     try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f: competitors_config = json.load(f)
-        status_report = {}
-        for item in competitors_config: status_report[item['name']] = "No significant changes detected."
-        if os.path.exists(LOG_FILE):
-            with open(LOG_FILE, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        data = json.loads(line)
-                        if data.get("competitor") in status_report and data.get("summary", {}).get("change_detected"):
-                            status_report[data["competitor"]] = data["summary"]
-                    except json.JSONDecodeError: continue
-        results_by_company = defaultdict(list)
-        for key, summary_or_status in status_report.items():
-            company_name, page_type = key.split('_')[0], key.split('_')[1] if '_' in key else 'General'
-            results_by_company[company_name].append((page_type, summary_or_status))
-        digest_md, competitor_number = f"## Competitor Intelligence Digest - {datetime.date.today()}\n", 1
-        for company_name, pages in sorted(results_by_company.items()):
-            digest_md += f"\n### {competitor_number}) {company_name} Summary:\n"
-            page_letter_code = ord('A')
-            for page_type, result in sorted(pages):
-                digest_md += f"\n**{chr(page_letter_code)}.** `{page_type}`: "
-                if isinstance(result, str): digest_md += result + "\n"
-                else:
-                    title, points = result.get('change_title', 'N/A'), result.get('summary_points', [])
-                    summary_text = "\n".join([f"  - {p}" for p in points])
-                    digest_md += f"**{title}**\n{summary_text}\n"
-                page_letter_code += 1
-            competitor_number += 1
-        return digest_md
+        return digest_state.render()
     except Exception as e:
         return f"## 🚨 Error Displaying Digest\n\nAn error occurred: \n\n```\n{str(e)}\n```"
 
+# Runs happen on a background thread of this process, so there is no interpreter start-up or re-import per click.
+monitor_runner = MonitorRunner(partial(run_monitor, config_path=CONFIG_FILE, snapshot_dir=SNAPSHOT_DIR,
+                                       slack_url=os.getenv("SLACK_WEBHOOK_URL"), summary_db_path=SUMMARY_DB,
+                                       summary_log_path=LOG_FILE))
+
 def run_monitor_script(model_name):
-    yield "🏃 Agent is starting the monitoring process..."
-    command = [PYTHON_EXECUTABLE, "monitor.py", "--model", model_name]
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', bufsize=1)
-    output_log = "--- Agent Log ---\n"
-    for line in iter(process.stdout.readline, ''):
-        output_log += line
-        yield output_log
-    process.wait()
+    if monitor_runner.start(model_name=model_name):
+        output_log = "--- Agent Log ---\n"
+    else:
+        output_log = f"--- Agent Log (already running with {monitor_runner.params.get('model_name')}; following that run) ---\n"
+    yield output_log
+    live, last_yield = {}, 0.0  # page (or company, when batched) -> AI analysis streamed so far
+    batch_of = {}  # page -> the company line its batched analysis streams into
+    for event in monitor_runner.follow():
+        if event["type"] == "token":
+            live[event["name"]] = live.get(event["name"], "") + event["text"]
+            for page in event.get("pages", []): batch_of[page] = event["name"]
+            if time.monotonic() - last_yield < 0.1: continue  # redraw at most ~10 times a second while streaming
+        else:
+            if event["type"] == "page":
+                # the page's own line (per-page or fallback analysis) and its batch's line, if any, are finished
+                live.pop(event["name"], None)
+                live.pop(batch_of.pop(event["name"], None), None)
+            if event["type"] in ("stages", "done"): live.clear()
+            output_log += format_event(event) + "\n"
+        last_yield = time.monotonic()
+        yield output_log + "".join(f"✍️ {name}: …{text[-160:]}\n" for name, text in live.items())
     yield output_log + "\n\n✅ Agent run complete. Click 'Generate Digest' to update."
 
+# Lazy and shared: the embedding model and database load on a background thread at start-up (or on first search).
+retriever = Retriever(DB_DIR, warmup=True)
+
+def ask_agent(question, model_name, speculative=False):
+    if not question or not question.strip():
+        yield ""; return
+    status, answer = "*Choosing a tool...*", ""
+    yield status
+    try:
+        for event in run_stream(question, retriever, model=model_name, speculative=speculative):
+            if event["type"] == "plan":
+                status = f"*Tool: {event['tool']} ({event.get('route', 'planner')}) - running...*"
+            elif event["type"] == "tool":
+                status = f"*Tool: {event['tool']} - writing the answer...*"
+            elif event["type"] == "token":
+                answer += event["text"]
+            elif event["type"] == "answer":
+                first = event["first_token_seconds"]
+                stages = " / ".join(f"{name} {seconds:.1f}s" for name, seconds in event["timings"].items())
+                status = (f"*Tool: {event['tool']} via {event['route']} · first token "
+                          f"{'n/a' if first is None else f'{first:.1f}s'} · total {event['seconds']:.1f}s ({stages})*")
+                spec = event.get("speculation")
+                if spec:
+                    status += (f"\n*Speculative: reused {spec['used'] or 'nothing'} ({spec['reused_seconds']:.1f}s), "
+                               f"wasted {spec['wasted_seconds']:.1f}s*")
+            yield f"{status}\n\n{answer}"
+    except Exception as e:
+        yield f"{status}\n\n{answer}\n\n🚨 Agent error: {e}"
+
 # --- Gradio Interface Definition ---
 with gr.Blocks(theme=gr.themes.Soft()) as demo:
     gr.Markdown("# 🕵️ Competitor Intelligence Agent")
@@ -71,11 +96,21 @@ with gr.Blocks(theme=gr.themes.Soft()) as demo:
             gr.Markdown("### Agent Log")
             log_output = gr.Textbox(label="Live Output", interactive=False, lines=15, max_lines=15)
     gr.Markdown("---")
+    gr.Markdown("### 💬 Ask the Agent")
+    with gr.Row():
+        question_box = gr.Textbox(label="Question", placeholder="Ask about your knowledge base, a URL, or anything else", scale=4)
+        ask_button = gr.Button("Ask", variant="secondary", scale=1)
+    speculative_box = gr.Checkbox(label="Start local search and Wikipedia lookup while the tool is being chosen", value=False)
+    answer_display = gr.Markdown()
+    gr.Markdown("---")
     gr.Markdown("### 📊 Latest Intelligence Digest")
     digest_button = gr.Button("📊 Generate Digest from History")
-    summary_display = gr.Markdown(value=load_and_format_digest())
+    summary_display = gr.Markdown()
     run_button.click(fn=run_monitor_script, inputs=[model_dropdown], outputs=log_output)
+    ask_button.click(fn=ask_agent, inputs=[question_box, model_dropdown, speculative_box], outputs=answer_display)
+    question_box.submit(fn=ask_agent, inputs=[question_box, model_dropdown, speculative_box], outputs=answer_display)
     digest_button.click(fn=load_and_format_digest, outputs=summary_display)
+    demo.load(fn=load_and_format_digest, outputs=summary_display)
 
 if __name__ == "__main__":
     demo.launch(share=True)
\ No newline at end of file
@@ -0,0 +1,96 @@
+# benchmarks/bench_chunk.py
+"""
+Compares the original rag.utils.chunk_text with the streaming rag.utils.iter_chunks boundary modes:
+chunk count, average size, throughput, how many chunks end mid-sentence, and how many exceed the
+embedding model's token limit (and would be silently truncated by the encoder).
+
+    python -m benchmarks.bench_chunk --pdf_dir domain/demo/seed_pdfs
+    python -m benchmarks.bench_chunk --text notes.txt --text manual.txt
+    python -m benchmarks.bench_chunk            # pages saved by bench_extract, or generated prose
+
+Token counts use the MiniLM tokenizer when `transformers` can load it, otherwise a word/punctuation estimate.
+"""
+import os
+import re
+import time
+import random
+import argparse
+from statistics import mean
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "pages")
+MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+MAX_TOKENS = 256 - 2  # MiniLM max_seq_length minus [CLS]/[SEP]
+
+def load_token_counter():
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(MODEL)
+        return lambda text: len(tokenizer.tokenize(text)), "MiniLM tokenizer"
+    except Exception:
+        return lambda text: len(re.findall(r"\w+|[^\w\s]", text)), "word/punctuation estimate"
+
+def load_documents(pdf_dir: str | None, texts: list, pages_dir: str):
+    docs = []
+    if pdf_dir and os.path.isdir(pdf_dir):
+        from rag.pdf import iter_pdf_pages
+        for name in sorted(os.listdir(pdf_dir)):
+            if name.lower().endswith(".pdf"):
+                docs.append(list(iter_pdf_pages(os.path.join(pdf_dir, name))))
+    for path in texts:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f: docs.append([(1, f.read())])
+    if not docs and os.path.isdir(pages_dir):
+        from rag.extract import extract_blocks
+        for name in sorted(os.listdir(pages_dir)):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(pages_dir, name), 'r', encoding='utf-8', errors='replace') as f:
+                    docs.append([(1, "\n\n".join(extract_blocks(f.read())))])
+    if not docs:
+        rng = random.Random(0)
+        words = "the pricing plan team workspace export api limit seat annual monthly feature integration".split()
+        sentence = lambda: " ".join(rng.choice(words) for _ in range(rng.randint(6, 30))).capitalize() + "."
+        docs = [[(p, "\n\n".join(" ".join(sentence() for _ in range(rng.randint(2, 6))) for _ in range(8)))
+                 for p in range(1, 41)] for _ in range(5)]
+    return docs
+
+def run(name: str, chunker, docs: list, count_tokens, repeat: int):
+    timings, chunks = [], []
+    for i in range(repeat):
+        started = time.perf_counter()
+        out = [chunk for doc in docs for chunk in chunker(doc)]
+        timings.append(time.perf_counter() - started)
+        if i == 0: chunks = out
+    mb = sum(len(t) for doc in docs for _, t in doc) / 2**20
+    tokens = [count_tokens(c) for c in chunks]
+    mid_sentence = sum(1 for c in chunks if not c.rstrip().endswith((".", "!", "?")))
+    print(f"{name:<10} {len(chunks):>7} {mean(len(c) for c in chunks) if chunks else 0:>10.0f} "
+          f"{mean(tokens) if tokens else 0:>11.0f} {sum(t > MAX_TOKENS for t in tokens):>10} "
+          f"{100 * mid_sentence / max(len(chunks), 1):>12.0f}% {mb / min(timings):>8.1f}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pdf_dir")
+    ap.add_argument("--text", action="append", default=[], help="Plain-text file to chunk (repeatable).")
+    ap.add_argument("--pages", default=PAGES_DIR, help="Saved HTML pages used when no --pdf_dir/--text is given.")
+    ap.add_argument("--max_chars", type=int, default=800)
+    ap.add_argument("--overlap", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    from rag.utils import clean_text, chunk_text, iter_chunks
+    docs = load_documents(args.pdf_dir, args.text, args.pages)
+    count_tokens, counter_name = load_token_counter()
+    print(f"{len(docs)} document(s), {sum(len(t) for d in docs for _, t in d) / 1024:.0f} KiB of text; "
+          f"tokens counted with the {counter_name}, limit {MAX_TOKENS}\n")
+    print(f"{'chunker':<10} {'chunks':>7} {'avg chars':>10} {'avg tokens':>11} {'over limit':>10} "
+          f"{'mid-sentence':>13} {'MB/s':>8}")
+
+    run("chunk_text", lambda doc: chunk_text(clean_text(" ".join(t for _, t in doc)), args.max_chars, args.overlap),
+        docs, count_tokens, args.repeat)
+    for boundary in ("chars", "sentence", "paragraph"):
+        options = {"boundary": boundary, "max_chars": args.max_chars, "overlap": args.overlap}
+        if boundary != "chars":
+            options.update(max_tokens=MAX_TOKENS, count_tokens=count_tokens)
+        run(boundary, lambda doc: (c for c, _, _ in iter_chunks(doc, **options)), docs, count_tokens, args.repeat)
+
+if __name__ == "__main__":
+    main()
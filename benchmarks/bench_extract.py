@@ -0,0 +1,106 @@
+# benchmarks/bench_extract.py
+"""
+Compares the rag.extract backends on saved real-world pages: milliseconds per page and peak memory.
+
+    # save the pages you care about once (competitors.json entries or a file with one URL per line)
+    python -m benchmarks.bench_extract --fetch competitors.json
+    # then benchmark every available backend over benchmarks/pages/*.html
+    python -m benchmarks.bench_extract
+
+Each backend runs in its own subprocess so that peak RSS (which also covers lxml's C allocations) is not
+inflated by the backends measured before it; tracemalloc's Python-heap peak is reported alongside, taken in
+a separate untimed pass.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tracemalloc
+from statistics import median
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "pages")
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def fetch_pages(source: str, pages_dir: str):
+    import requests
+    if source.endswith(".json"):
+        with open(source, 'r', encoding='utf-8') as f: targets = [(c["name"], c["url"]) for c in json.load(f)]
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            targets = [(f"page{i}", line.strip()) for i, line in enumerate(f) if line.strip()]
+    os.makedirs(pages_dir, exist_ok=True)
+    for name, url in targets:
+        try:
+            r = requests.get(url, timeout=15, headers={"User-Agent": "Mozilla/5.0"})
+            r.raise_for_status()
+        except requests.RequestException as e:
+            print(f"[skip] {url}: {e}"); continue
+        with open(os.path.join(pages_dir, f"{name}.html"), 'w', encoding='utf-8') as f: f.write(r.text)
+        print(f"saved {name} ({len(r.text) / 1024:.0f} KiB)")
+
+def load_pages(pages_dir: str):
+    pages = []
+    for name in sorted(os.listdir(pages_dir)) if os.path.isdir(pages_dir) else []:
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(pages_dir, name), 'r', encoding='utf-8', errors='replace') as f: pages.append(f.read())
+    return pages
+
+def measure(backend: str, pages: list, repeat: int):
+    from rag.extract import extract_blocks
+    rss_before = _peak_rss_mb()
+    extract_blocks(pages[0], backend)  # warm-up: imports and first-call setup
+    # timed passes run without tracemalloc, whose allocation hooks would slow the Python-heavy backends most
+    timings = []
+    for _ in range(repeat):
+        for html in pages:
+            started = time.perf_counter()
+            extract_blocks(html, backend)
+            timings.append((time.perf_counter() - started) * 1000)
+    rss_after = _peak_rss_mb()
+    # one separate pass for the Python-heap peak
+    tracemalloc.start()
+    for html in pages: extract_blocks(html, backend)
+    heap_peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return {"backend": backend, "ms_per_page": median(timings), "heap_peak_mb": heap_peak,
+            "rss_peak_mb": rss_after, "rss_growth_mb": None if rss_after is None else rss_after - rss_before}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", default=PAGES_DIR)
+    ap.add_argument("--fetch", help="competitors.json or a URL list to download into --pages first")
+    ap.add_argument("--backends", default="lxml,stream,bs4")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.fetch: fetch_pages(args.fetch, args.pages)
+    pages = load_pages(args.pages)
+    if not pages:
+        print(f"No .html pages in {args.pages}; save some with --fetch competitors.json"); return
+    if args.child:
+        print(json.dumps(measure(args.child, pages, args.repeat))); return
+
+    total_kib = sum(len(p) for p in pages) / 1024
+    print(f"{len(pages)} page(s), {total_kib:.0f} KiB of HTML, {args.repeat} repeat(s)\n")
+    print(f"{'backend':<8} {'ms/page':>9} {'heap peak MB':>13} {'RSS peak MB':>12}")
+    for backend in args.backends.split(","):
+        cmd = [sys.executable, "-m", "benchmarks.bench_extract", "--pages", args.pages,
+               "--repeat", str(args.repeat), "--child", backend]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{backend:<8} unavailable ({proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'})"); continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        rss = "n/a" if r["rss_peak_mb"] is None else f"{r['rss_peak_mb']:.1f}"
+        print(f"{backend:<8} {r['ms_per_page']:>9.2f} {r['heap_peak_mb']:>13.1f} {rss:>12}")
+
+if __name__ == "__main__":
+    main()
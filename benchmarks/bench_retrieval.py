@@ -0,0 +1,126 @@
+# benchmarks/bench_retrieval.py
+"""
+Latency and recall of the two Retriever backends at the vector level (query encoding is identical for both):
+Chroma's HNSW index vs the NumPy VectorIndex over the memory-mapped compact store.
+
+    # an existing database ingested with `python -m rag.ingest --vector_store both`
+    python -m benchmarks.bench_retrieval --persist_dir ./db
+    # or generated vectors, stored as float32, float16 and int8
+    python -m benchmarks.bench_retrieval --synthetic 50000
+
+Queries are stored vectors plus noise; recall@k is measured against exact float32 search. For --persist_dir the
+float32 ground truth is read from Chroma; with --no_chroma the compact store's own (dequantized) vectors are the
+reference, so a float16/int8 store then shows recall 1.0 and its quantization loss is not measured.
+"""
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+
+from rag.vectors import VectorStore, VectorIndex, DTYPES
+
+def _percentiles(samples):
+    return np.percentile(np.array(samples) * 1000, [50, 95])
+
+def make_synthetic(root: str, n: int, dim: int, with_chroma: bool):
+    rng = np.random.default_rng(0)
+    emb = rng.standard_normal((n, dim)).astype(np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    ids = [f"c{i}" for i in range(n)]
+    metas = [{"source": f"doc{i // 50}.pdf"} for i in range(n)]
+    for dtype in DTYPES:
+        store = VectorStore(os.path.join(root, f"vectors_{dtype}"), dtype=dtype)
+        store.upsert(ids=ids, documents=ids, metadatas=metas, embeddings=emb)
+        store.save()
+    col = None
+    if with_chroma:
+        import chromadb
+        col = chromadb.PersistentClient(path=os.path.join(root, "chroma")).get_or_create_collection("docs")
+        for start in range(0, n, 4096):
+            col.add(ids=ids[start:start + 4096], documents=ids[start:start + 4096],
+                    metadatas=metas[start:start + 4096], embeddings=emb[start:start + 4096].tolist())
+    return {dtype: os.path.join(root, f"vectors_{dtype}") for dtype in DTYPES}, col
+
+def chroma_embeddings(col, page: int = 4096):
+    """(ids, float32 matrix) of every vector in the collection, read in pages."""
+    ids, embs = [], []
+    for offset in range(0, col.count(), page):
+        got = col.get(include=["embeddings"], limit=page, offset=offset)
+        ids += got["ids"]; embs.append(np.asarray(got["embeddings"], dtype=np.float32))
+    return ids, np.vstack(embs) if embs else np.zeros((0, 0), dtype=np.float32)
+
+def bench_index(name, load, queries, exact, k, batch):
+    started = time.perf_counter()
+    search_many = load()
+    load_ms = (time.perf_counter() - started) * 1000
+    single = []
+    found = []
+    for q in queries:
+        started = time.perf_counter()
+        found.append(search_many(q[None, :], k)[0])
+        single.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        search_many(queries[i:i + batch], k)
+    qps = len(queries) / (time.perf_counter() - started)
+    recall = np.mean([len(set(f) & set(e)) / k for f, e in zip(found, exact)])
+    p50, p95 = _percentiles(single)
+    print(f"{name:<16} {load_ms:>9.0f} {p50:>8.2f} {p95:>8.2f} {qps:>12.0f} {recall:>10.3f}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--persist_dir", help="Database ingested with --vector_store both")
+    ap.add_argument("--synthetic", type=int, default=0, help="Generate this many random vectors instead")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=4)
+    ap.add_argument("--batch", type=int, default=32)
+    ap.add_argument("--no_chroma", action="store_true", help="Only benchmark the NumPy backend")
+    args = ap.parse_args()
+
+    tmp = None
+    if args.synthetic:
+        tmp = tempfile.TemporaryDirectory()
+        paths, col = make_synthetic(tmp.name, args.synthetic, args.dim, not args.no_chroma)
+    elif args.persist_dir:
+        paths = {VectorStore(os.path.join(args.persist_dir, "vectors")).dtype: os.path.join(args.persist_dir, "vectors")}
+        col = None
+        if not args.no_chroma:
+            import chromadb
+            col = chromadb.PersistentClient(path=args.persist_dir).get_or_create_collection("docs")
+    else:
+        ap.error("pass --persist_dir or --synthetic N")
+
+    reference = VectorIndex(next(iter(paths.values())))
+    if not len(reference):
+        print("The compact store is empty; ingest with --vector_store both first."); return
+    if args.persist_dir and col is not None:
+        rows, exact_matrix = chroma_embeddings(col)  # the unquantized vectors
+    else:
+        rows, exact_matrix = [r["id"] for r in reference.rows], np.asarray(reference.matrix, dtype=np.float32)
+        if args.persist_dir:
+            print(f"Note: recall is measured against the {reference.dtype} compact store itself, not float32 vectors.")
+    rng = np.random.default_rng(1)
+    queries = exact_matrix[rng.choice(len(rows), size=min(args.queries, len(rows)), replace=False)]
+    queries = queries + rng.normal(0, 0.05, queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    exact = [[rows[i] for i in np.argsort(-(q @ exact_matrix.T))[:args.k]] for q in queries]
+
+    print(f"{len(rows)} vectors, {queries.shape[0]} queries, k={args.k}, batches of {args.batch}\n")
+    print(f"{'backend':<16} {'load ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'batched q/s':>12} {'recall@k':>10}")
+    for dtype, path in paths.items():
+        def load(path=path):
+            index = VectorIndex(path)
+            return lambda qs, k: [[index.rows[i]["id"] for i, _ in hits] for hits in index.search_many(qs, k)]
+        bench_index(f"numpy {dtype}", load, queries, exact, args.k, args.batch)
+    if col is not None:
+        def load_chroma():
+            col.count()  # opens the HNSW index
+            return lambda qs, k: col.query(query_embeddings=qs.tolist(), n_results=k, include=[])["ids"]
+        bench_index("chroma", load_chroma, queries, exact, args.k, args.batch)
+    if tmp is not None:
+        tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
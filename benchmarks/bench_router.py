@@ -0,0 +1,113 @@
+# benchmarks/bench_router.py
+"""
+Checks router.Router on labelled questions before its embedding classifier is turned on.
+
+    # accuracy and coverage of the MiniLM classifier for a grid of thresholds (no LLM needed)
+    python -m benchmarks.bench_router
+    python -m benchmarks.bench_router --labelled my_questions.jsonl   # {"query": ..., "tool": ...} per line
+    # end-to-end: median planning and answer latency with the LLM planner only, rules, and rules + classifier
+    python -m benchmarks.bench_router --latency --model mistral:7b --persist_dir ./db
+
+The grid shows, per (min_score, min_margin), the share of non-rule questions the classifier answers without the
+planner and how many of those it gets right. Pick thresholds whose accuracy you can live with.
+"""
+import json
+import time
+import argparse
+from statistics import median
+
+from router import Router, rule_route
+
+# Questions not in router.EXEMPLARS, labelled with the tool a careful planner would pick.
+LABELLED = [
+    ("What do our docs say about resetting a password?", "vector_search"),
+    ("How is the retention policy described in the handbook?", "vector_search"),
+    ("Find the onboarding checklist in our knowledge base", "vector_search"),
+    ("Which plans are listed in the ingested pricing PDF?", "vector_search"),
+    ("What does the manual recommend for backups?", "vector_search"),
+    ("Summarize our internal guidelines on security reviews", "vector_search"),
+    ("Who painted the Mona Lisa?", "wiki"),
+    ("What is the tallest mountain in Africa?", "wiki"),
+    ("When was the printing press invented?", "wiki"),
+    ("Tell me about the French Revolution", "wiki"),
+    ("What is quantum entanglement?", "wiki"),
+    ("Who was the first person on the Moon?", "wiki"),
+    ("Write a haiku about the sea", "none"),
+    ("Make this paragraph shorter", "none"),
+    ("Suggest a title for my blog post about cooking", "none"),
+    ("Translate 'thank you very much' into Spanish", "none"),
+    ("Compose a birthday message for a colleague", "none"),
+    ("Tell me a riddle", "none"),
+    ("What is 17 * 23?", "calc"),
+    ("summarize https://example.com/blog", "web"),
+    ("hello!", "none"),
+]
+
+def load_labelled(path: str | None):
+    if not path: return LABELLED
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["query"], row["tool"]) for row in rows]
+
+class EncoderOnly:
+    """The part of agent.Retriever the router uses, without opening the database."""
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+
+    def embed_query(self, query: str):
+        return self.encoder.encode([query], normalize_embeddings=True)[0]
+
+def threshold_grid(labelled: list, retriever):
+    router, scored, rule_hits = Router(log=lambda _: None, use_embeddings=True), [], 0
+    for query, expected in labelled:
+        rule = rule_route(query)
+        if rule is not None:
+            rule_hits += rule["tool"] == expected
+            print(f"{'rule':<10} {rule['tool']:<14} {'':>6} {'':>7} {'ok' if rule['tool'] == expected else 'WRONG':<5} {query}")
+            continue
+        tool, score, margin = router.classify(retriever.embed_query(query), retriever.encoder)
+        scored.append((tool == expected, score, margin))
+        print(f"{'embedding':<10} {tool:<14} {score:>6.2f} {margin:>7.2f} {'ok' if tool == expected else 'WRONG':<5} {query}")
+    n_rule = len(labelled) - len(scored)
+    print(f"\nRules: {rule_hits}/{n_rule} correct. Classifier over the other {len(scored)} question(s):")
+    print(f"{'min_score':>9} {'min_margin':>10} {'routed':>7} {'accuracy':>9}")
+    for min_score in (0.3, 0.4, 0.5, 0.6):
+        for min_margin in (0.0, 0.04, 0.08, 0.12):
+            routed = [ok for ok, score, margin in scored if score >= min_score and margin >= min_margin]
+            accuracy = f"{sum(routed) / len(routed):.2f}" if routed else "-"
+            print(f"{min_score:>9.2f} {min_margin:>10.2f} {len(routed) / max(len(scored), 1):>7.0%} {accuracy:>9}")
+
+def latency(labelled: list, persist_dir: str, model: str):
+    import agent
+    retriever = agent.Retriever(persist_dir, warmup=True)
+    routers = {"planner": None, "rules": Router(log=lambda _: None),
+               "rules+embed": Router(log=lambda _: None, use_embeddings=True)}
+    print(f"{'router':<12} {'median plan s':>14} {'median total s':>15} {'planner calls':>14}")
+    for name, router in routers.items():
+        plans, totals, planner_calls = [], [], 0
+        for query, _ in labelled:
+            started = time.perf_counter()
+            answer = list(agent.run_stream(query, retriever, model=model, router=router))[-1]
+            totals.append(time.perf_counter() - started)
+            plans.append(answer["timings"]["plan"])
+            planner_calls += answer["route"] == "planner"
+        print(f"{name:<12} {median(plans):>14.2f} {median(totals):>15.2f} {planner_calls:>14}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--labelled", help="JSON lines with 'query' and 'tool' (default: the built-in set)")
+    ap.add_argument("--latency", action="store_true", help="Also time full agent runs (needs Ollama and a database)")
+    ap.add_argument("--persist_dir", default="./db")
+    ap.add_argument("--model", default="mistral:7b")
+    args = ap.parse_args()
+
+    labelled = load_labelled(args.labelled)
+    from sentence_transformers import SentenceTransformer
+    threshold_grid(labelled, EncoderOnly(SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")))
+    if args.latency:
+        print()
+        latency(labelled, args.persist_dir, args.model)
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,21 @@ import time
 import datetime
 from datetime import timezone
 import requests
-from bs4 import BeautifulSoup
 import ollama
-import difflib
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from pathlib import Path
+from urllib.parse import urlparse
 from dotenv import load_dotenv
+from monitoring.snapshots import SnapshotStore
+from rag.extract import extract_blocks, resolve_backend, BACKENDS, EXTRACTOR_VERSION
+from rag.http_client import http_get
+from monitoring.sections import fingerprints, diff_sections, format_section_diff
+from monitoring.normalize import compile_rules, normalize_blocks
+from monitoring.llm_cache import SummaryCache
+from monitoring.pipeline import Stage, run_pipeline
+from monitoring.summary_store import SummaryStore
 
 def format_and_send_digest(all_changes: dict, slack_url: str):
     """Groups all changes by category and sends a professional digest to Slack."""
@@ -32,7 +42,7 @@ def format_and_send_digest(all_changes: dict, slack_url: str):
         master_blocks.append({"type": "divider"})
         master_blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": f"*{category}:*"}})
         for change in changes:
-            company = change['competitor'].split('_')[0]
+            company = company_of(change['competitor'])
             title = change['summary'].get('change_title', 'N/A')
             update = change['summary'].get('update', 'N/A')
             impact = change['summary'].get('impact', 'N/A')
@@ -57,33 +67,129 @@ def format_and_send_digest(all_changes: dict, slack_url: str):
         print(f"Failed to send consolidated digest to Slack: {e}")
 
 
-def fetch_text_from_url(url: str):
+def download_page(url: str, validators: dict | None = None, log=print):
+    """
+    Conditionally downloads a page using the validators saved with its last snapshot.
+    Returns (status, html, validators) where status is "changed", "not_modified" or "error"; the reason for an
+    error goes to `log`. A 304, or a 200 whose raw body hashes to the stored value, is "not_modified" and carries no body.
+    """
+    validators = validators or {}
     try:
-        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
-        response = requests.get(url, timeout=15, headers=headers)
+        headers = {}
+        if validators.get("etag"): headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"): headers["If-Modified-Since"] = validators["last_modified"]
+        response = http_get(url, headers=headers, timeout=15)
+        if response.status_code == 304:
+            return "not_modified", None, validators
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        for tag in soup(["script", "style", "noscript"]): tag.decompose()
-        from rag.utils import clean_text
-        return clean_text(soup.get_text(separator=" "))
+        new_validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body_hash": hashlib.sha256(response.content).hexdigest(),
+        }
+        if validators.get("body_hash") == new_validators["body_hash"]:
+            return "not_modified", None, new_validators
+        return "changed", response.text, new_validators
     except requests.RequestException as e:
-        print(f"[Error] Could not fetch URL {url}: {e}"); return None
+        log(f"[Error] Could not fetch URL {url}: {e}"); return "error", None, validators
+
+def extract_page_text(html: str, rules: dict | None = None, backend: str = "auto"):
+    """
+    Turns page HTML into snapshot text: one block (heading, paragraph, list item, table row...) per line,
+    so changes can be diffed per section. `rules` (from monitoring.normalize.compile_rules) strip volatile
+    content before the text is hashed. `backend` picks the rag.extract parser.
+    """
+    blocks = extract_blocks(html, backend, ignore_selectors=(rules or {}).get("selectors"))
+    return "\n".join(normalize_blocks(blocks, rules))
+
+def extraction_signature(rules: dict | None = None, backend: str = "auto") -> str:
+    """
+    Identifies everything that shapes a page's snapshot text: the extractor version, the parser actually used
+    and the normalization rules. Snapshots made under another signature are re-baselined, not diffed.
+    """
+    rules = rules or {}
+    parser = "bs4" if rules.get("selectors") else resolve_backend(backend)
+    patterns = [(getattr(p, "pattern", p), repl) for p, repl in rules.get("patterns", [])]
+    key = json.dumps([EXTRACTOR_VERSION, parser, patterns, rules.get("selectors", [])])
+    return f"v{EXTRACTOR_VERSION}-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]}"
+
+def fetch_page(url: str, validators: dict | None = None, rules: dict | None = None):
+    """download_page followed by extract_page_text; returns (status, text, validators)."""
+    status, html, validators = download_page(url, validators)
+    return status, extract_page_text(html, rules) if status == "changed" else None, validators
+
+def fetch_text_from_url(url: str):
+    return fetch_page(url)[1]
+
+def fetch_all(competitors: list, max_workers: int = 8, per_host: int = 2, validators_by_name: dict | None = None,
+              rules_by_name: dict | None = None, ordered: bool = True, fetch=fetch_page):
+    """
+    Fetches every competitor URL concurrently and yields (competitor, fetch_page result) in config order,
+    or as soon as each one finishes when `ordered` is False.
+    At most `max_workers` requests are in flight overall and at most `per_host` per host;
+    waiting work stays queued per host so it never ties up a worker slot.
+    Any other `fetch(url, validators)` (e.g. download_page, when extraction happens in a later pipeline stage)
+    is called without the rules.
+    """
+    queued_by_host = defaultdict(deque)
+    for i, competitor in enumerate(competitors):
+        queued_by_host[urlparse(competitor.get("url") or "").netloc].append(i)
+    per_host, max_workers = max(1, per_host), max(1, max_workers)
+    validators_by_name, rules_by_name = validators_by_name or {}, rules_by_name or {}
+    active_by_host, in_flight, results, next_index = defaultdict(int), {}, {}, 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while queued_by_host or in_flight:
+            # Hand out free slots one host at a time so no single host starves the others.
+            scheduled = True
+            while scheduled and len(in_flight) < max_workers:
+                scheduled = False
+                for host in list(queued_by_host):
+                    if len(in_flight) >= max_workers: break
+                    if active_by_host[host] >= per_host: continue
+                    i = queued_by_host[host].popleft()
+                    if not queued_by_host[host]: del queued_by_host[host]
+                    competitor = competitors[i]
+                    name = competitor.get("name")
+                    args = (validators_by_name.get(name), rules_by_name.get(name)) if fetch is fetch_page else (validators_by_name.get(name),)
+                    future = pool.submit(fetch, competitor.get("url"), *args)
+                    in_flight[future] = (host, i)
+                    active_by_host[host] += 1
+                    scheduled = True
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                host, i = in_flight.pop(future)
+                active_by_host[host] -= 1
+                results[i] = future.result()
+                if not ordered: yield competitors[i], results.pop(i)
+
+            while ordered and next_index in results:
+                yield competitors[next_index], results.pop(next_index)
+                next_index += 1
 
 def get_text_hash(text: str):
     if not text: return None
     return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
-# FINAL, SUPERCHARGED AI function
-def summarize_change_with_ai(old_text: str, new_text: str, url: str, model_to_use: str):
-    print("  -> AI is generating a detailed analysis...")
-    diff = list(difflib.unified_diff(old_text.splitlines(), new_text.splitlines(), fromfile='old', tofile='new', n=5))
-    if not diff: return {"change_detected": False}
-    diff_report = "\n".join(diff)
-    if len(diff_report) > 4000: diff_report = diff_report[:4000] + "\n... (diff truncated)"
-    
-    # FINAL, UPGRADED SYSTEM PROMPT
-    system_prompt = """
+def build_diff_report(old_text: str | None, new_text: str, old_fps: list | None = None, new_fps: list | None = None,
+                      load_old_text=None, max_chars: int = 4000):
+    """
+    Section-level diff between two snapshot texts (one block per line), compared by block fingerprint.
+    The old text is only needed when blocks were removed, so it can be passed lazily via `load_old_text`.
+    """
+    old_fps = old_fps if old_fps is not None else fingerprints(old_text)
+    new_fps = new_fps if new_fps is not None else fingerprints(new_text)
+    hunks = diff_sections(old_fps, new_fps)
+    if not hunks: return ""
+    if old_text is None and any(h["removed"] for h in hunks): old_text = load_old_text()
+    old_blocks = old_text.split("\n") if old_text else []
+    return format_section_diff(hunks, old_blocks, new_text.split("\n"), max_chars=max_chars)
+
+# FINAL, UPGRADED SYSTEM PROMPT
+SUMMARY_SYSTEM_PROMPT = """
     You are a world-class principal product analyst. Your job is to analyze a 'diff report' from a competitor's webpage and provide a deeply insightful, structured summary.
+    The report lists only the page sections that changed. Each '@@' line names the unchanged section they follow.
     Lines starting with '-' were removed. Lines starting with '+' were added.
 
     Your response MUST be a valid JSON object. ALL fields (`change_category`, `change_title`, `update`, `impact`, `analysis`) are REQUIRED.
@@ -101,60 +207,307 @@ def summarize_change_with_ai(old_text: str, new_text: str, url: str, model_to_us
     
     If the change is insignificant (typos, date changes), return JSON with "change_detected" set to false.
     """
+
+# Part of the summary cache key, so editing the prompt never serves answers produced by an older one.
+PROMPT_VERSION = hashlib.sha256(SUMMARY_SYSTEM_PROMPT.encode('utf-8')).hexdigest()[:12]
+
+# FINAL, SUPERCHARGED AI function
+def _chat_json(model: str, system_prompt: str, user_prompt: str, on_token=None) -> str:
+    """JSON-mode chat reply; with `on_token` the reply is streamed and every piece is passed to it as it arrives."""
+    messages = [{'role': 'system', 'content': system_prompt}, {'role': 'user', 'content': user_prompt}]
+    if on_token is None:
+        return ollama.chat(model=model, messages=messages, format='json')['message']['content']
+    parts = []
+    for chunk in ollama.chat(model=model, messages=messages, format='json', stream=True):
+        piece = chunk['message']['content']
+        if piece: parts.append(piece); on_token(piece)
+    return "".join(parts)
+
+def summarize_change_with_ai(old_text: str, new_text: str, url: str, model_to_use: str, diff_report: str | None = None,
+                             cache: SummaryCache | None = None, log=print, on_token=None, cache_key: str | None = None):
+    """`cache_key` is passed by callers that already looked the diff up and missed; only the new result is stored."""
+    if diff_report is None: diff_report = build_diff_report(old_text, new_text)
+    if not diff_report: return {"change_detected": False}
+    if cache and cache_key is None:
+        cache_key = SummaryCache.make_key(diff_report, model_to_use, PROMPT_VERSION)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            log("  -> Reusing cached AI analysis for this diff."); return cached
+    log("  -> AI is generating a detailed analysis...")
     user_prompt = f"Analyze this diff report from {url}:\n\n{diff_report}"
     try:
-        response = ollama.chat(model=model_to_use, messages=[{'role': 'system', 'content': system_prompt}, {'role': 'user', 'content': user_prompt}], format='json')
-        return json.loads(response['message']['content'])
+        summary = json.loads(_chat_json(model_to_use, SUMMARY_SYSTEM_PROMPT, user_prompt, on_token))
+        if cache: cache.put(cache_key, summary)
+        return summary
+    except Exception as e:
+        log(f"  -> AI summary failed with error: {e}"); return None
+
+BATCH_SYSTEM_PROMPT = SUMMARY_SYSTEM_PROMPT + """
+    You will receive SEVERAL diff reports from the same company, each starting with a line '### PAGE: <name> (<url>)'.
+    Analyze each page on its own and return ONE JSON object of the form {"pages": {"<name>": <object as above>, ...}}
+    with exactly one entry for every page name you were given.
+    """
+
+def company_of(competitor_name: str):
+    return competitor_name.split('_')[0]
+
+def _valid_summary(summary):
+    if not isinstance(summary, dict) or not isinstance(summary.get("change_detected"), bool): return False
+    required = ("change_category", "change_title", "update", "impact", "analysis")
+    return not summary["change_detected"] or all(isinstance(summary.get(k), str) and summary[k] for k in required)
+
+def summarize_batch_with_ai(pages: list, model_to_use: str, log=print, on_token=None):
+    """
+    Analyzes several diffs ({"name", "url", "diff_report"}) from one company in a single model round-trip.
+    Returns {name: summary} or None when the reply is not valid JSON covering every page.
+    """
+    log(f"  -> AI is analyzing {len(pages)} page(s) of {company_of(pages[0]['name'])} in one batch...")
+    user_prompt = "\n\n".join(f"### PAGE: {p['name']} ({p['url']})\n{p['diff_report']}" for p in pages)
+    try:
+        results = json.loads(_chat_json(model_to_use, BATCH_SYSTEM_PROMPT, user_prompt, on_token)).get("pages")
+        if isinstance(results, dict) and all(_valid_summary(results.get(p["name"])) for p in pages):
+            return {p["name"]: results[p["name"]] for p in pages}
+        log("  -> Batched AI reply failed validation.")
     except Exception as e:
-        print(f"  -> AI summary failed with error: {e}"); return None
+        log(f"  -> Batched AI summary failed with error: {e}")
+    return None
+
+def plan_batches(pages: list, token_budget: int):
+    """Greedily packs pages into batches whose diff reports fit `token_budget` (about 4 characters per token)."""
+    batches, current, used = [], [], 0
+    for page in pages:
+        cost = len(page["diff_report"]) // 4 + 1
+        if current and used + cost > token_budget:
+            batches.append(current); current, used = [], 0
+        current.append(page); used += cost
+    if current: batches.append(current)
+    return batches
 
-def save_summary_to_log(summary_json: dict, competitor_name: str, log_file="summary_log.jsonl"):
+def save_summary_to_log(summary_json: dict, competitor_name: str, log_file="summary_log.jsonl",
+                        store: SummaryStore | None = None):
+    """
+    Appends to the JSONL history and records the summary in the indexed store the digest reads from.
+    Without a `store`, the database next to `log_file` is used (summary_log.jsonl -> summary_log.db).
+    """
     entry = {"timestamp": datetime.datetime.now(timezone.utc).isoformat(), "competitor": competitor_name, "summary": summary_json}
     with open(log_file, 'a', encoding='utf-8') as f:
         f.write(json.dumps(entry) + '\n')
+    if store is not None:
+        store.add(competitor_name, summary_json, entry["timestamp"])
+    else:
+        with SummaryStore(str(Path(log_file).with_suffix(".db")), import_from=log_file) as store: store.add(competitor_name, summary_json, entry["timestamp"])
+
+# --- Pipeline stages (fetch -> extract -> detect -> summarize -> log) ---
+# Each stage takes and returns one work item dict. Messages are collected on the item and printed by the
+# log stage in config order, so the run output stays deterministic however the stages interleave.
+
+def _extract_stage(item: dict, rules_by_name: dict, backend: str):
+    if item["status"] == "changed":
+        html = item.pop("html")
+        try:
+            item["text"] = extract_page_text(html, rules_by_name.get(item["competitor"].get("name")), backend)
+        except Exception as e:  # one unparsable page (or bad rule) must not stop the run
+            item["error"] = f"Could not extract text: {e}"
+            item["log"].append(f"  [Error] {item['error']}")
+            item["status"] = "error"
+    return item
+
+def _detect_stage(item: dict, store: SnapshotStore, signatures: dict | None = None):
+    """
+    The only stage touching the snapshot store, so its index is written from a single thread.
+    A snapshot taken with different extraction settings (see extraction_signature) is replaced without a diff.
+    """
+    name = item["competitor"].get("name")
+    signature = (signatures or {}).get(name)
+    item["outcome"] = item["status"]
+    if item["status"] == "not_modified":
+        item["log"].append("  -> Not modified since last snapshot.")
+        store.set_validators(name, item["validators"])
+    if item["status"] != "changed": return item
+
+    new_text = item["text"]
+    new_hash, old_hash = get_text_hash(new_text), store.latest_hash(name)
+    new_fps = fingerprints(new_text)
+    item["outcome"] = "unchanged"
+    if old_hash is None:
+        item["log"].append(f"  -> First time seeing {name}. Creating snapshot.")
+        item["outcome"] = "new"
+    elif signature and store.extractor(name) != signature:
+        item["log"].append(f"  -> Extraction settings changed for {name}; re-baselining the snapshot without a diff.")
+        item["outcome"] = "rebaselined"
+    elif new_hash != old_hash:
+        item["log"].append(f"  -> Change DETECTED for {name}!")
+        item["outcome"] = "changed"
+        item["diff_report"] = build_diff_report(None, new_text, store.load_fingerprints(old_hash), new_fps,
+                                                load_old_text=lambda: store.load_text(old_hash))
+    store.put(name, new_text, item["validators"], text_hash=new_hash, block_fingerprints=new_fps, extractor=signature)
+    item.pop("text")
+    return item
+
+def _summarize_stage(item: dict, model_name: str, cache: SummaryCache | None, stream=None):
+    if item.get("diff_report") is not None:
+        name = item["competitor"].get("name")
+        item["summary"] = summarize_change_with_ai(None, None, item["competitor"].get("url"), model_to_use=model_name,
+                                                   diff_report=item.pop("diff_report"), cache=cache, log=item["log"].append,
+                                                   on_token=stream(name) if stream else None)
+    return item
+
+def _group_stage(item: dict, groups: dict, expected: dict):
+    """Holds items until every page of the item's company has passed detection, then releases them as one group."""
+    company = company_of(item["competitor"].get("name"))
+    groups[company].append(item)
+    if len(groups[company]) < expected[company]: return []
+    return [groups.pop(company)]
+
+def _summarize_group_stage(group: list, model_name: str, cache: SummaryCache | None, token_budget: int, stream=None):
+    """Batched counterpart of _summarize_stage: cached pages are served first, the rest go out in budgeted batches."""
+    pages = []
+    for item in group:
+        diff_report = item.pop("diff_report", None)
+        if diff_report is None: continue
+        if not diff_report: item["summary"] = {"change_detected": False}; continue
+        key = SummaryCache.make_key(diff_report, model_name, PROMPT_VERSION) if cache else None
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            item["log"].append("  -> Reusing cached AI analysis for this diff."); item["summary"] = cached; continue
+        pages.append({"item": item, "key": key, "name": item["competitor"].get("name"),
+                      "url": item["competitor"].get("url"), "diff_report": diff_report})
+
+    for batch in plan_batches(pages, token_budget):
+        log = batch[0]["item"]["log"].append
+        on_token = stream(company_of(batch[0]["name"]), [p["name"] for p in batch]) if stream else None
+        results = summarize_batch_with_ai(batch, model_name, log=log, on_token=on_token) if len(batch) > 1 else None
+        if results is None and len(batch) > 1: log("  -> Falling back to one AI call per page.")
+        for page in batch:
+            if results is not None:
+                page["item"]["summary"] = results[page["name"]]
+                if cache: cache.put(page["key"], results[page["name"]])
+            else:
+                page["item"]["summary"] = summarize_change_with_ai(None, None, page["url"], model_to_use=model_name,
+                                                                   diff_report=page["diff_report"], cache=cache,
+                                                                   cache_key=page["key"], log=page["item"]["log"].append,
+                                                                   on_token=stream(page["name"]) if stream else None)
+    return group
 
-def run_monitor(config_path: str, snapshot_dir: str, model_name: str, slack_url: str):
-    print(f"--- Starting Competitor Monitor (using model: {model_name}) ---")
+def run_monitor(config_path: str, snapshot_dir: str, model_name: str, slack_url: str, workers: int = 8, per_host: int = 2,
+                llm_cache_path: str | None = "llm_cache.sqlite3", llm_workers: int = 1, queue_size: int = 8,
+                batch_by_company: bool = False, batch_token_budget: int = 3000, summary_db_path: str | None = None,
+                on_event=None, extractor: str = "auto", summary_log_path: str = "summary_log.jsonl"):
+    """
+    Checks every competitor page and analyzes the changes. `on_event`, if given, receives progress dicts with a
+    "type" of "start", "page" (per-URL outcome, stage timings and the "error" of a failed page), "change", "stages"
+    and "done", plus "token" events carrying the AI analyses as they stream in (these are sent from the AI worker
+    threads). Tokens of a batched request are named after the company and list the batch's page names under "pages".
+    """
+    emit = on_event or (lambda event: None)
+    # per page (or company, for batches): a callback forwarding streamed reply pieces as "token" events
+    def token_stream(name, pages=None):
+        extra = {"pages": pages} if pages else {}
+        return lambda text: emit({"type": "token", "name": name, "text": text, **extra})
+    stream = token_stream if on_event else None
+    run_started = time.perf_counter()
+    print(f"--- Starting Competitor Monitor (using model: {model_name}, {workers} fetch workers, {per_host} per host, "
+          f"{llm_workers} AI worker(s)) ---")
     
     try:
         with open(config_path, 'r', encoding='utf-8') as f: competitors = json.load(f)
     except FileNotFoundError:
-        print(f"[Error] Config file not found: {config_path}"); return
+        print(f"[Error] Config file not found: {config_path}")
+        emit({"type": "done", "error": f"Config file not found: {config_path}", "changes": 0, "seconds": 0.0}); return
 
-    os.makedirs(snapshot_dir, exist_ok=True)
+    store = SnapshotStore(snapshot_dir)
+    cache = SummaryCache(llm_cache_path) if llm_cache_path else None
+    # the indexed copy of the JSONL history lives next to it unless placed elsewhere explicitly
+    summary_db_path = summary_db_path or str(Path(summary_log_path).with_suffix(".db"))
+    summaries = SummaryStore(summary_db_path, import_from=summary_log_path)
     
     detected_changes = []
+    rules_by_name, config_errors = {}, {}
+    for c in competitors:
+        try: rules_by_name[c.get("name")] = compile_rules(c)
+        except ValueError as e: config_errors[c.get("name")] = str(e)
+    signatures = {name: extraction_signature(rules, extractor) for name, rules in rules_by_name.items()}
+    # pages last extracted with other settings are fetched in full so they can be re-baselined
+    validators_by_name = {name: store.validators(name) if store.extractor(name) == signatures[name] else {}
+                          for name in signatures}
+    index_of = {id(c): i for i, c in enumerate(competitors)}
+    not_modified = 0
+    emit({"type": "start", "total": len(competitors), "model": model_name})
+
+    def timed_download(url, validators=None):
+        # runs on a fetch worker: messages are kept with the result and printed by the log stage, in config order
+        started, messages = time.perf_counter(), []
+        return download_page(url, validators, log=messages.append), time.perf_counter() - started, messages
+
+    def fetched_items():
+        # entries with invalid normalization rules are reported as errors without being fetched
+        for competitor in competitors:
+            if competitor.get("name") in config_errors:
+                yield {"index": index_of[id(competitor)], "competitor": competitor, "status": "error", "validators": {},
+                       "error": config_errors[competitor.get("name")],
+                       "log": [f"  [Error] {config_errors[competitor.get('name')]}"], "timings": {}}
+        valid = [c for c in competitors if c.get("name") not in config_errors]
+        for competitor, ((status, html, validators), seconds, messages) in fetch_all(
+                valid, max_workers=workers, per_host=per_host, validators_by_name=validators_by_name,
+                ordered=False, fetch=timed_download):
+            item = {"index": index_of[id(competitor)], "competitor": competitor, "status": status,
+                    "html": html, "validators": validators, "log": [f"  {m}" for m in messages],
+                    "timings": {"fetch": seconds}}
+            if status == "error" and messages: item["error"] = messages[-1].removeprefix("[Error] ")
+            yield item
+
+    stages = [
+        Stage("extract", partial(_extract_stage, rules_by_name=rules_by_name, backend=extractor), queue_size=queue_size),
+        Stage("detect", partial(_detect_stage, store=store, signatures=signatures), queue_size=queue_size),
+    ]
+    if batch_by_company:
+        # One request per company (the name prefix before '_'), split further only to respect the token budget.
+        expected = defaultdict(int)
+        for c in competitors: expected[company_of(c.get("name"))] += 1
+        stages += [
+            Stage("group", partial(_group_stage, groups=defaultdict(list), expected=expected),
+                  queue_size=queue_size, fan_out=True),
+            Stage("summarize", partial(_summarize_group_stage, model_name=model_name, cache=cache,
+                                       token_budget=batch_token_budget, stream=stream),
+                  workers=llm_workers, queue_size=queue_size, fan_out=True),
+        ]
+    else:
+        stages.append(Stage("summarize", partial(_summarize_stage, model_name=model_name, cache=cache, stream=stream),
+                            workers=llm_workers, queue_size=queue_size))
+
+    # Log stage: runs here, on one thread, releasing items in config order through a small reorder buffer.
+    pending, next_index = {}, 0
+    for item in run_pipeline(fetched_items(), stages):
+        pending[item["index"]] = item
+        while next_index in pending:
+            item = pending.pop(next_index); next_index += 1
+            name, url = item["competitor"].get("name"), item["competitor"].get("url")
+            print(f"\nChecking: {name} ({url})")
+            for line in item["log"]: print(line)
+            not_modified += item["status"] == "not_modified"
+            emit({"type": "page", "name": name, "url": url, "status": item.get("outcome", item["status"]),
+                  "done": next_index, "total": len(competitors), "timings": item.get("timings", {}),
+                  **({"error": item["error"]} if item.get("error") else {})})
+            ai_summary = item.get("summary")
+            if ai_summary and ai_summary.get("change_detected"):
+                change_data = {"competitor": name, "summary": ai_summary}
+                detected_changes.append(change_data)
+                save_summary_to_log(ai_summary, name, log_file=summary_log_path, store=summaries)
+                emit({"type": "change", "name": name, "summary": ai_summary})
 
-    for competitor in competitors:
-        name, url = competitor.get("name"), competitor.get("url")
-        print(f"\nChecking: {name} ({url})")
-        new_text = fetch_text_from_url(url)
-        if new_text is None: continue
-        
-        new_hash, snapshot_file_path = get_text_hash(new_text), os.path.join(snapshot_dir, f"{name}.txt")
-        
-        if os.path.exists(snapshot_file_path):
-            with open(snapshot_file_path, 'r', encoding='utf-8') as f: old_text = f.read()
-            old_hash = get_text_hash(old_text)
-
-            if new_hash != old_hash:
-                print(f"  -> Change DETECTED for {name}!")
-                ai_summary = summarize_change_with_ai(old_text, new_text, url, model_to_use=model_name)
-                
-                if ai_summary and ai_summary.get("change_detected"):
-                    change_data = {"competitor": name, "summary": ai_summary}
-                    detected_changes.append(change_data)
-                    save_summary_to_log(ai_summary, name)
-                
-                with open(snapshot_file_path, 'w', encoding='utf-8') as f: f.write(new_text)
-        else:
-            print(f"  -> First time seeing {name}. Creating snapshot."); 
-            with open(snapshot_file_path, 'w', encoding='utf-8') as f: f.write(new_text)
+    print(f"\n{not_modified}/{len(competitors)} page(s) unchanged on the server (skipped parsing).")
+    print("Stage busy time: " + ", ".join(f"{s.name} {s.busy_seconds:.1f}s/{s.items}" for s in stages))
+    emit({"type": "stages", "stages": {s.name: {"seconds": s.busy_seconds, "items": s.items} for s in stages}})
+    if cache:
+        print(f"AI summary cache: {cache.hits} hit(s), {cache.misses} miss(es).")
+        cache.close()
+    summaries.close()
 
     if slack_url and detected_changes:
         format_and_send_digest(detected_changes, slack_url)
     
     print("\n--- Monitor run complete ---")
+    emit({"type": "done", "changes": len(detected_changes), "seconds": time.perf_counter() - run_started})
 
 if __name__ == "__main__":
     load_dotenv()
@@ -163,5 +516,19 @@ if __name__ == "__main__":
     parser.add_argument("--config", default="competitors.json")
     parser.add_argument("--snapshots", default="./snapshots")
     parser.add_argument("--model", default="phi3")
+    parser.add_argument("--workers", type=int, default=8, help="Maximum concurrent page fetches.")
+    parser.add_argument("--per-host", type=int, default=2, help="Maximum concurrent fetches against a single host.")
+    parser.add_argument("--llm-cache", default="llm_cache.sqlite3", help="SQLite file memoizing AI summaries; pass '' to disable.")
+    parser.add_argument("--llm-workers", type=int, default=1, help="Concurrent AI analyses; match your Ollama server's OLLAMA_NUM_PARALLEL.")
+    parser.add_argument("--queue-size", type=int, default=8, help="Items buffered between pipeline stages before upstream stages wait.")
+    parser.add_argument("--extractor", default="auto", choices=BACKENDS, help="HTML-to-text backend (see rag/extract.py).")
+    parser.add_argument("--batch-by-company", action="store_true", help="Analyze all changed pages of a company in one AI request.")
+    parser.add_argument("--batch-token-budget", type=int, default=3000, help="Approximate diff tokens allowed per batched AI request.")
+    parser.add_argument("--summary-log", default="summary_log.jsonl", help="JSONL history the summaries are appended to.")
+    parser.add_argument("--summary-db", default=None, help="SQLite index of the summaries (default: next to --summary-log, as .db).")
     args = parser.parse_args()
-    run_monitor(config_path=args.config, snapshot_dir=args.snapshots, model_name=args.model, slack_url=SLACK_URL_FROM_ENV)
\ No newline at end of file
+    run_monitor(config_path=args.config, snapshot_dir=args.snapshots, model_name=args.model, slack_url=SLACK_URL_FROM_ENV,
+                workers=args.workers, per_host=args.per_host, llm_cache_path=args.llm_cache,
+                llm_workers=args.llm_workers, queue_size=args.queue_size,
+                batch_by_company=args.batch_by_company, batch_token_budget=args.batch_token_budget, extractor=args.extractor,
+                summary_log_path=args.summary_log, summary_db_path=args.summary_db)
\ No newline at end of file
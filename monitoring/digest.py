@@ -0,0 +1,88 @@
+# monitoring/digest.py
+import os
+import json
+import datetime
+import threading
+from monitoring.summary_store import SummaryStore
+
+NO_CHANGE = "No significant changes detected."
+
+class DigestState:
+    """
+    In-memory digest that only consumes summaries added since the last refresh: rows after the last seen id of the
+    SQLite store or, when no database is configured, lines after the last byte offset of the JSONL log.
+    Markdown is cached per company and only re-rendered for companies whose latest summary changed.
+    """
+
+    def __init__(self, config_path: str, log_path: str, db_path: str | None = None):
+        self.config_path, self.log_path, self.db_path = config_path, log_path, db_path
+        self.latest = {}            # competitor -> (timestamp, summary) of its latest detected change
+        self.offset = 0             # last consumed row id (db) or byte offset (jsonl)
+        self.sections = {}          # company -> rendered markdown body
+        self.dirty = set()
+        self.names, self._config_mtime = [], None
+        self._lock = threading.Lock()
+
+    def _reload_config(self):
+        mtime = os.path.getmtime(self.config_path)
+        if mtime == self._config_mtime: return
+        with open(self.config_path, 'r', encoding='utf-8') as f: self.names = list(dict.fromkeys(item['name'] for item in json.load(f)))
+        self._config_mtime, self.sections, self.dirty = mtime, {}, {name.split('_')[0] for name in self.names}
+
+    def _new_entries(self):
+        if self.db_path:
+            with SummaryStore(self.db_path, import_from=self.log_path) as store: entries = store.after(self.offset)
+            if entries: self.offset = entries[-1]["id"]
+            return entries
+        if not os.path.exists(self.log_path): return []
+        if os.path.getsize(self.log_path) < self.offset:  # log was truncated or replaced: start over
+            self.offset, self.latest = 0, {}
+            self.dirty |= {name.split('_')[0] for name in self.names}
+        with open(self.log_path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        complete = data[:data.rfind(b'\n') + 1]  # leave a half-written last line for the next refresh
+        self.offset += len(complete)
+        entries = []
+        for line in complete.decode('utf-8').splitlines():
+            try: entries.append(json.loads(line))
+            except json.JSONDecodeError: continue
+        return entries
+
+    def refresh(self):
+        self._reload_config()
+        for entry in self._new_entries():
+            competitor, summary, timestamp = entry.get("competitor"), entry.get("summary") or {}, entry.get("timestamp") or ""
+            if not summary.get("change_detected"): continue
+            if competitor in self.latest and self.latest[competitor][0] > timestamp: continue
+            self.latest[competitor] = (timestamp, summary)
+            self.dirty.add(competitor.split('_')[0])
+
+    def _render_company(self, company: str):
+        pages = []
+        for name in self.names:
+            if name.split('_')[0] != company: continue
+            page_type = name.split('_')[1] if '_' in name else 'General'
+            pages.append((page_type, self.latest[name][1] if name in self.latest else NO_CHANGE))
+        md, page_letter_code = "", ord('A')
+        for page_type, result in sorted(pages, key=lambda p: p[0]):
+            md += f"\n**{chr(page_letter_code)}.** `{page_type}`: "
+            if isinstance(result, str): md += result + "\n"
+            else:
+                title, points = result.get('change_title', 'N/A'), result.get('summary_points', [])
+                summary_text = "\n".join([f"  - {p}" for p in points])
+                md += f"**{title}**\n{summary_text}\n"
+            page_letter_code += 1
+        return md
+
+    def render(self):
+        """Refreshes from the log and returns the full digest markdown."""
+        with self._lock:
+            self.refresh()
+            companies = sorted({name.split('_')[0] for name in self.names})
+            for company in self.dirty & set(companies): self.sections[company] = self._render_company(company)
+            self.dirty = set()
+            digest_md = f"## Competitor Intelligence Digest - {datetime.date.today()}\n"
+            for number, company in enumerate(companies, 1):
+                digest_md += f"\n### {number}) {company} Summary:\n" + self.sections[company]
+            return digest_md
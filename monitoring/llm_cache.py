@@ -0,0 +1,58 @@
+# monitoring/llm_cache.py
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+class SummaryCache:
+    """
+    On-disk memo of AI change summaries, keyed by (normalized diff, model, system prompt version).
+    Entries older than `max_age_days` are dropped and the least recently used are evicted past `max_entries`.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, max_age_days: float = 90):
+        self.max_entries, self.max_age = max_entries, max_age_days * 86400
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                         "created REAL NOT NULL, last_used REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self.evict()
+
+    @staticmethod
+    def make_key(diff_report: str, model: str, prompt_version: str):
+        normalized = "\n".join(" ".join(line.split()) for line in diff_report.strip().splitlines())
+        return hashlib.sha256("\0".join([model, prompt_version, normalized]).encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None or time.time() - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)", (key, json.dumps(value), now, now))
+            self._db.commit()
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            self._db.execute("DELETE FROM summaries WHERE created < ?", (time.time() - self.max_age,))
+            self._db.execute("DELETE FROM summaries WHERE key NOT IN "
+                             "(SELECT key FROM summaries ORDER BY last_used DESC LIMIT ?)", (self.max_entries,))
+            self._db.commit()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock: self._db.close()
@@ -0,0 +1,67 @@
+# monitoring/normalize.py
+import re
+
+_MONTH = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*\.?"
+_CURRENCY = "$€£¥₹₩₽₺₫₱₪฿₴₦¢"
+_COUNTED = (r"(?:users?|customers?|clients?|teams?|compan(?:y|ies)|businesses|organi[sz]ations?|brands?|people|members?"
+            r"|developers?|subscribers?|followers?|visitors?|views?|downloads?|installs?|sign-?ups?|stars?|reviews?"
+            r"|ratings?|orders?)")
+
+# Built-in rules for content that churns on every load without meaning anything: (name, pattern, replacement).
+# They run in this order, so full timestamps are collapsed before their time or number parts.
+BUILTIN_RULES = [
+    ("dates", re.compile(r"\b\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?)?\b"), "<date>"),
+    ("dates", re.compile(rf"\b{_MONTH} \d{{1,2}}(?:st|nd|rd|th)?,? \d{{4}}\b|\b\d{{1,2}} {_MONTH},? \d{{4}}\b"), "<date>"),
+    ("dates", re.compile(r"\b\d{1,2}/\d{1,2}/\d{2,4}\b"), "<date>"),
+    ("times", re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?(?:\s*[AaPp]\.?[Mm]\b\.?)?"), "<time>"),
+    ("times", re.compile(r"\b\d+\s+(?:second|minute|hour|day|week|month|year)s?\s+ago\b", re.IGNORECASE), "<time>"),
+    ("hex", re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<token>"),
+    ("hex", re.compile(r"\b(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{16,}\b"), "<token>"),
+    # Counters such as "1,234,567 teams" or "48213 downloads": only numbers followed by a counted noun, so amounts
+    # ("1,000 USD", "EUR 12,500", "₹49,999", "12500 kr") are never hidden and a price change is always seen.
+    ("counters", re.compile(rf"(?<![\d.,{_CURRENCY}])\b(?:\d{{1,3}}(?:,\d{{3}})+|\d{{5,}})(?:\.\d+)?\+?"
+                            rf"(?=\s+(?:(?:happy|active|paying|satisfied|monthly|daily)\s+)?{_COUNTED}\b)", re.IGNORECASE),
+     "<num>"),
+]
+BUILTIN_RULE_NAMES = sorted({name for name, _, _ in BUILTIN_RULES})
+
+def compile_rules(competitor: dict) -> dict:
+    """
+    Builds the normalization rules for one competitors.json entry. Optional keys:
+      "normalize":        list of built-in rule names to apply (default: all), or false to disable them
+      "ignore_patterns":  regexes whose matches are removed from the page text
+      "ignore_selectors": CSS selectors whose elements are dropped before text extraction
+    """
+    enabled = competitor.get("normalize", True)
+    if enabled is True: enabled = BUILTIN_RULE_NAMES
+    elif not enabled: enabled = []
+    unknown = set(enabled) - set(BUILTIN_RULE_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown normalize rule(s) for {competitor.get('name')}: {sorted(unknown)}")
+    patterns = [(pattern, repl) for name, pattern, repl in BUILTIN_RULES if name in enabled]
+    for p in competitor.get("ignore_patterns", []):
+        try: patterns.append((re.compile(p), ""))
+        except re.error as e: raise ValueError(f"Invalid ignore_patterns entry {p!r} for {competitor.get('name')}: {e}") from e
+    selectors = list(competitor.get("ignore_selectors", []))
+    for selector in selectors: _check_selector(selector, competitor.get("name"))
+    return {"patterns": patterns, "selectors": selectors}
+
+def _check_selector(selector: str, name: str | None):
+    """Raises ValueError for CSS the bs4 backend would reject mid-run (checked only when soupsieve is installed)."""
+    try:
+        import soupsieve
+    except ImportError:
+        return
+    try: soupsieve.compile(selector)
+    except soupsieve.SelectorSyntaxError as e:
+        raise ValueError(f"Invalid ignore_selectors entry {selector!r} for {name}: {e}") from e
+
+def normalize_blocks(blocks: list, rules: dict | None) -> list:
+    """Applies the rules to every block, dropping blocks that end up empty."""
+    if not rules or not rules.get("patterns"): return blocks
+    out = []
+    for block in blocks:
+        for pattern, repl in rules["patterns"]: block = pattern.sub(repl, block)
+        block = " ".join(block.split())
+        if block: out.append(block)
+    return out
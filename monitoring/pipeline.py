@@ -0,0 +1,89 @@
+# monitoring/pipeline.py
+import time
+import queue
+import threading
+
+_DONE = object()
+
+class Stage:
+    """
+    One pipeline step: `fn(item) -> item` run by `workers` threads reading from a bounded queue.
+    With `fan_out`, `fn` returns an iterable instead and each of its elements is passed on (possibly none).
+    """
+
+    def __init__(self, name: str, fn, workers: int = 1, queue_size: int = 8, fan_out: bool = False):
+        self.name, self.fn, self.workers, self.queue_size = name, fn, max(1, workers), max(1, queue_size)
+        self.fan_out = fan_out
+        self.busy_seconds, self.items = 0.0, 0
+
+def run_pipeline(source, stages: list):
+    """
+    Pushes every item from the `source` iterable through `stages` in order and yields what the last stage
+    returns, in completion order. Dict items, and the dicts inside list items such as batched groups, get a
+    "timings" entry with the seconds each stage spent on them. Queues between stages are bounded, so a
+    saturated stage blocks the ones before it (down to `source`) instead of buffering without limit.
+    Exceptions raised by `source` or a stage stop the pipeline and are re-raised here.
+    """
+    inboxes = [queue.Queue(maxsize=stage.queue_size) for stage in stages] + [queue.Queue()]
+    remaining = [stage.workers for stage in stages]
+    lock, errors, stop = threading.Lock(), [], threading.Event()
+
+    def put(q, item):
+        # Bounded put that gives up once the pipeline is stopping, so no thread blocks forever after an error.
+        while not stop.is_set():
+            try: q.put(item, timeout=0.1); return True
+            except queue.Full: continue
+        return False
+
+    def finish(k):
+        with lock:
+            remaining[k] -= 1
+            last = remaining[k] == 0
+        if last:
+            for _ in range(stages[k + 1].workers if k + 1 < len(stages) else 1): put(inboxes[k + 1], _DONE)
+
+    def feed():
+        try:
+            for item in source:
+                if not put(inboxes[0], item): return
+        except Exception as e:
+            errors.append(e); stop.set()
+        finally:
+            for _ in range(stages[0].workers): put(inboxes[0], _DONE)
+
+    def work(k):
+        stage = stages[k]
+        try:
+            while not stop.is_set():
+                try: item = inboxes[k].get(timeout=0.1)
+                except queue.Empty: continue
+                if item is _DONE: break
+                started = time.perf_counter()
+                result = stage.fn(item)
+                elapsed = time.perf_counter() - started
+                with lock: stage.busy_seconds += elapsed; stage.items += 1
+                for member in (item if isinstance(item, list) else [item]):
+                    if isinstance(member, dict): member.setdefault("timings", {})[stage.name] = elapsed
+                for out in (result if stage.fan_out else [result]):
+                    if not put(inboxes[k + 1], out): return
+        except Exception as e:
+            errors.append(e); stop.set()
+        finally:
+            finish(k)
+
+    threads = [threading.Thread(target=feed, name="pipeline-source", daemon=True)]
+    threads += [threading.Thread(target=work, args=(k,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                for k, stage in enumerate(stages) for n in range(stage.workers)]
+    for t in threads: t.start()
+    try:
+        while True:
+            try: item = inboxes[-1].get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set(): break
+                continue
+            if item is _DONE: break
+            yield item
+    finally:
+        stop.set()
+        for t in threads: t.join()
+    if errors: raise errors[0]
@@ -0,0 +1,66 @@
+# monitoring/runner.py
+import threading
+
+class MonitorRunner:
+    """
+    Runs the monitor (normally monitor.run_monitor) on a background thread inside the current process and
+    replays its progress events to any number of followers. Only one run is active at a time; starting while
+    one is active lets the caller follow that run instead.
+    """
+
+    def __init__(self, run_fn):
+        self.run_fn = run_fn
+        self.events, self.active, self.params = [], False, {}
+        self._cond = threading.Condition()
+
+    def start(self, **params):
+        """Starts a run with `params` and returns True, or returns False if a run is already active."""
+        with self._cond:
+            if self.active: return False
+            self.events, self.active, self.params = [], True, params
+        threading.Thread(target=self._run, args=(params,), name="monitor-run", daemon=True).start()
+        return True
+
+    def _run(self, params: dict):
+        try:
+            self.run_fn(on_event=self._emit, **params)
+        except Exception as e:
+            self._emit({"type": "done", "error": str(e), "changes": 0, "seconds": 0.0})
+        finally:
+            with self._cond:
+                self.active = False
+                self._cond.notify_all()
+
+    def _emit(self, event: dict):
+        with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def follow(self):
+        """Yields every event of the current (or last) run from the beginning, until that run has finished."""
+        seen = 0
+        while True:
+            with self._cond:
+                while seen == len(self.events) and self.active: self._cond.wait(timeout=1.0)
+                new_events, finished = self.events[seen:], not self.active
+            seen += len(new_events)
+            yield from new_events
+            if finished and seen == len(self.events): return
+
+def format_event(event: dict):
+    """One log line per progress event, for the UI ("token" events are shown live instead, see app.py)."""
+    kind = event.get("type")
+    if kind == "start":
+        return f"🏃 Checking {event['total']} page(s) with model {event['model']}..."
+    if kind == "page":
+        timings = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in event.get("timings", {}).items())
+        line = f"[{event['done']}/{event['total']}] {event['name']}: {event['status']}" + (f" ({timings})" if timings else "")
+        return line + (f" - {event['error']}" if event.get("error") else "")
+    if kind == "change":
+        return f"  💡 {event['name']}: {event['summary'].get('change_title', 'N/A')}"
+    if kind == "stages":
+        return "Stage time: " + ", ".join(f"{name} {s['seconds']:.1f}s/{s['items']}" for name, s in event["stages"].items())
+    if kind == "done":
+        if event.get("error"): return f"🚨 Run failed: {event['error']}"
+        return f"Finished in {event['seconds']:.1f}s with {event['changes']} significant change(s)."
+    return str(event)
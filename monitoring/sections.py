@@ -0,0 +1,68 @@
+# monitoring/sections.py
+import hashlib
+from bisect import bisect_left
+from collections import Counter
+
+def fingerprint(block: str) -> str:
+    return hashlib.blake2b(block.encode('utf-8'), digest_size=8).hexdigest()
+
+def fingerprints(text: str) -> list:
+    """Snapshots store one block per line; this returns the per-block fingerprints of such a text."""
+    return [fingerprint(block) for block in text.split("\n")] if text else []
+
+def _anchors(old_fps: list, new_fps: list) -> list:
+    """Patience-diff anchors: blocks unique on both sides, kept in the longest order-preserving run (O(n log n))."""
+    old_counts, new_counts = Counter(old_fps), Counter(new_fps)
+    new_pos = {fp: j for j, fp in enumerate(new_fps) if new_counts[fp] == 1}
+    pairs = [(i, new_pos[fp]) for i, fp in enumerate(old_fps) if old_counts[fp] == 1 and fp in new_pos]
+
+    tails, tail_idx, prev = [], [], [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails): tails.append(j); tail_idx.append(k)
+        else: tails[pos] = j; tail_idx[pos] = k
+        prev[k] = tail_idx[pos - 1] if pos else None
+    run, k = [], tail_idx[-1] if tail_idx else None
+    while k is not None:
+        run.append(pairs[k]); k = prev[k]
+    return run[::-1]
+
+def diff_sections(old_fps: list, new_fps: list) -> list:
+    """
+    Compares two block fingerprint lists and returns hunks of
+    {"anchor": index of the preceding unchanged new block or -1, "removed": [old indices], "added": [new indices]}.
+    Blocks that only moved within a gap are treated as unchanged.
+    """
+    hunks = []
+    bounds = [(-1, -1)] + _anchors(old_fps, new_fps) + [(len(old_fps), len(new_fps))]
+    for (i0, j0), (i1, j1) in zip(bounds, bounds[1:]):
+        if i1 - i0 == 1 and j1 - j0 == 1: continue
+        old_gap, new_gap = range(i0 + 1, i1), range(j0 + 1, j1)
+        common = Counter(old_fps[i] for i in old_gap) & Counter(new_fps[j] for j in new_gap)
+        removed, added, kept = [], [], Counter(common)
+        for i in old_gap:
+            if kept[old_fps[i]] > 0: kept[old_fps[i]] -= 1
+            else: removed.append(i)
+        kept = Counter(common)
+        for j in new_gap:
+            if kept[new_fps[j]] > 0: kept[new_fps[j]] -= 1
+            else: added.append(j)
+        if removed or added:
+            hunks.append({"anchor": j0, "removed": removed, "added": added})
+    return hunks
+
+def format_section_diff(hunks: list, old_blocks: list, new_blocks: list, max_chars: int = 4000) -> str:
+    """Renders hunks as a compact diff report, dropping whole hunks (never cutting one) past `max_chars`."""
+    out, size = [], 0
+    for n, hunk in enumerate(hunks):
+        lines = []
+        if hunk["anchor"] >= 0: lines.append(f"@@ after: {new_blocks[hunk['anchor']][:120]} @@")
+        else: lines.append("@@ top of page @@")
+        lines += [f"- {old_blocks[i]}" for i in hunk["removed"]]
+        lines += [f"+ {new_blocks[j]}" for j in hunk["added"]]
+        chunk = "\n".join(lines)
+        if out and size + len(chunk) > max_chars:
+            out.append(f"... ({len(hunks) - n} more changed section(s) omitted)")
+            break
+        out.append(chunk[:max_chars]); size += len(chunk)
+    return "\n".join(out)
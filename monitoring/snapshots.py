@@ -0,0 +1,113 @@
+# monitoring/snapshots.py
+import os
+import json
+import gzip
+import hashlib
+import datetime
+from datetime import timezone
+
+class SnapshotStore:
+    """
+    Content-addressed snapshot store.
+    Every version of a page is kept once, gzip-compressed, under objects/<hh>/<sha256>.txt.gz,
+    next to a .fp file with one fingerprint per text block (see monitoring.sections).
+    index.json maps each competitor name to its latest hash, timestamp, size, HTTP validators and history,
+    so change detection is a dictionary lookup and old text is only read when a diff is needed.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.json")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f: self.index = json.load(f)
+        self._import_legacy_snapshots()
+
+    @staticmethod
+    def hash_text(text: str):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _object_path(self, text_hash: str):
+        return os.path.join(self.objects_dir, text_hash[:2], f"{text_hash}.txt.gz")
+
+    def _fingerprint_path(self, text_hash: str):
+        return os.path.join(self.objects_dir, text_hash[:2], f"{text_hash}.fp")
+
+    def latest(self, name: str):
+        return self.index.get(name)
+
+    def latest_hash(self, name: str):
+        entry = self.index.get(name)
+        return entry["hash"] if entry else None
+
+    def validators(self, name: str):
+        entry = self.index.get(name)
+        return dict(entry.get("validators") or {}) if entry else {}
+
+    def extractor(self, name: str):
+        """Signature of the extraction settings the latest snapshot was made with (None for older snapshots)."""
+        return (self.index.get(name) or {}).get("extractor")
+
+    def history(self, name: str):
+        entry = self.index.get(name)
+        return list(entry.get("history", [])) if entry else []
+
+    def load_text(self, text_hash: str):
+        with gzip.open(self._object_path(text_hash), 'rt', encoding='utf-8') as f: return f.read()
+
+    def load_fingerprints(self, text_hash: str):
+        """Per-block fingerprints of a stored version; falls back to the text for versions stored without them."""
+        path = self._fingerprint_path(text_hash)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f: return f.read().split()
+        from monitoring.sections import fingerprints
+        return fingerprints(self.load_text(text_hash))
+
+    def put(self, name: str, text: str, validators: dict | None = None, text_hash: str | None = None,
+            block_fingerprints: list | None = None, extractor: str | None = None):
+        """Stores `text` as the latest version of `name` and returns its hash. Identical content is written once."""
+        text_hash = text_hash or self.hash_text(text)
+        path = self._object_path(text_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f: f.write(text)
+            os.replace(tmp_path, path)
+        if block_fingerprints is not None and not os.path.exists(self._fingerprint_path(text_hash)):
+            with open(self._fingerprint_path(text_hash), 'w', encoding='utf-8') as f: f.write("\n".join(block_fingerprints))
+
+        version = {"hash": text_hash, "timestamp": datetime.datetime.now(timezone.utc).isoformat(), "size": len(text)}
+        entry = self.index.setdefault(name, {"history": []})
+        if entry.get("hash") != text_hash: entry["history"].append(version)
+        entry.update(version)
+        if validators is not None: entry["validators"] = validators
+        if extractor is not None: entry["extractor"] = extractor
+        self.save()
+        return text_hash
+
+    def set_validators(self, name: str, validators: dict):
+        if name in self.index and self.index[name].get("validators") != validators:
+            self.index[name]["validators"] = validators
+            self.save()
+
+    def save(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f: json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _import_legacy_snapshots(self):
+        """Pulls plain <name>.txt snapshots (and their .meta.json validators) from older runs into the store."""
+        for file_name in os.listdir(self.root):
+            if not file_name.endswith(".txt"): continue
+            name = file_name[:-4]
+            if name in self.index: continue
+            with open(os.path.join(self.root, file_name), 'r', encoding='utf-8') as f: text = f.read()
+            validators, meta_path = {}, os.path.join(self.root, f"{name}.meta.json")
+            if os.path.exists(meta_path):
+                try:
+                    with open(meta_path, 'r', encoding='utf-8') as f: validators = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    pass
+            self.put(name, text, validators)
@@ -0,0 +1,103 @@
+# monitoring/summary_store.py
+import os
+import json
+import sqlite3
+import argparse
+import datetime
+import threading
+from datetime import timezone
+
+class SummaryStore:
+    """
+    SQLite store of AI change summaries, indexed by competitor, timestamp and category, so the digest can ask for
+    "latest change per competitor" or "changes since X" without scanning the whole history.
+    """
+
+    def __init__(self, path: str = "summary_log.db", import_from: str | None = "summary_log.jsonl"):
+        """A new database is seeded once from the JSONL history at `import_from`, if that file exists."""
+        first_use = not os.path.exists(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                competitor TEXT NOT NULL,
+                company TEXT NOT NULL,
+                category TEXT,
+                change_detected INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                UNIQUE (competitor, timestamp)
+            );
+            CREATE INDEX IF NOT EXISTS summaries_competitor_time ON summaries (competitor, timestamp);
+            CREATE INDEX IF NOT EXISTS summaries_time ON summaries (timestamp);
+            CREATE INDEX IF NOT EXISTS summaries_category_time ON summaries (category, timestamp);
+        """)
+        if first_use and import_from and os.path.exists(import_from): self.import_jsonl(import_from)
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    @staticmethod
+    def _row(competitor: str, summary: dict, timestamp: str | None):
+        timestamp = timestamp or datetime.datetime.now(timezone.utc).isoformat()
+        return (timestamp, competitor, competitor.split('_')[0], summary.get("change_category"),
+                int(bool(summary.get("change_detected"))), json.dumps(summary))
+
+    def _insert(self, rows: list):
+        with self._lock:
+            cursor = self._db.executemany("INSERT OR IGNORE INTO summaries "
+                                          "(timestamp, competitor, company, category, change_detected, summary) "
+                                          "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+            return cursor.rowcount
+
+    def add(self, competitor: str, summary: dict, timestamp: str | None = None):
+        self._insert([self._row(competitor, summary, timestamp)])
+
+    def _entries(self, sql: str, params=()):
+        with self._lock: rows = self._db.execute(sql, params).fetchall()
+        return [{"id": r[0], "timestamp": r[1], "competitor": r[2], "summary": json.loads(r[3])} for r in rows]
+
+    def latest_per_competitor(self, detected_only: bool = True):
+        """{competitor: summary} of each competitor's most recent (detected) change."""
+        where = "WHERE change_detected = 1" if detected_only else ""
+        entries = self._entries(f"""
+            SELECT s.id, s.timestamp, s.competitor, s.summary FROM summaries s
+            JOIN (SELECT competitor, MAX(timestamp) AS ts FROM summaries {where} GROUP BY competitor) latest
+              ON s.competitor = latest.competitor AND s.timestamp = latest.ts""")
+        return {e["competitor"]: e["summary"] for e in entries}
+
+    def after(self, last_id: int = 0):
+        """Entries added after row `last_id`, in insertion order; lets readers consume the store incrementally."""
+        return self._entries("SELECT id, timestamp, competitor, summary FROM summaries WHERE id > ? ORDER BY id", (last_id,))
+
+    def since(self, timestamp: str, category: str | None = None):
+        """Entries at or after an ISO timestamp, oldest first, optionally for one change category."""
+        if category:
+            return self._entries("SELECT id, timestamp, competitor, summary FROM summaries "
+                                 "WHERE category = ? AND timestamp >= ? ORDER BY timestamp", (category, timestamp))
+        return self._entries("SELECT id, timestamp, competitor, summary FROM summaries "
+                             "WHERE timestamp >= ? ORDER BY timestamp", (timestamp,))
+
+    def import_jsonl(self, path: str):
+        """One-shot import of a summary_log.jsonl file; already-imported lines are ignored. Returns rows added."""
+        rows = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try: data = json.loads(line)
+                except json.JSONDecodeError: continue
+                if data.get("competitor") and isinstance(data.get("summary"), dict):
+                    rows.append(self._row(data["competitor"], data["summary"], data.get("timestamp")))
+        return self._insert(rows) if rows else 0
+
+    def close(self):
+        with self._lock: self._db.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Import a summary_log.jsonl history into the SQLite summary store.")
+    ap.add_argument("--db", default="summary_log.db")
+    ap.add_argument("--import_jsonl", default="summary_log.jsonl")
+    args = ap.parse_args()
+    with SummaryStore(args.db, import_from=None) as store:
+        print(f"Imported {store.import_jsonl(args.import_jsonl)} summaries from {args.import_jsonl} into {args.db}")
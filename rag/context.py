@@ -0,0 +1,105 @@
+# rag/context.py
+"""
+Context assembly for the answer prompt: retrieval hits (relevance order) are merged where chunks of the same source
+overlap, near-duplicates are dropped, and the rest is fitted into a token budget before being numbered as
+[i] (source) citations.
+"""
+import math
+import re
+
+MIN_OVERLAP = 20       # shortest suffix/prefix match treated as two chunks being adjacent
+DUPLICATE_SIMILARITY = 0.8
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token, close enough for budgeting English prompts without a tokenizer."""
+    return math.ceil(len(text) / 4)
+
+def overlap_length(a: str, b: str, min_overlap: int = MIN_OVERLAP) -> int:
+    """Length of the longest suffix of `a` that is also a prefix of `b` (0 if shorter than min_overlap)."""
+    if min(len(a), len(b)) < min_overlap:
+        return 0
+    head = b[:min_overlap]
+    pos = a.find(head, max(0, len(a) - len(b)))
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return len(a) - pos
+        pos = a.find(head, pos + 1)
+    return 0
+
+def _shingles(text: str, n: int = 3):
+    words = re.findall(r"\w+", text.lower())
+    return {tuple(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+
+def near_duplicate(a: str, b: str, threshold: float = DUPLICATE_SIMILARITY) -> bool:
+    """True if one text contains the other or their word 3-gram Jaccard similarity reaches `threshold`."""
+    if a in b or b in a:
+        return True
+    sa, sb = _shingles(a), _shingles(b)
+    return len(sa & sb) / max(1, len(sa | sb)) >= threshold
+
+def _merge(a: str, b: str):
+    """`a` and `b` joined on their overlap, in whichever order they are adjacent, or None."""
+    ov = overlap_length(a, b)
+    if ov:
+        return a + b[ov:]
+    ov = overlap_length(b, a)
+    if ov:
+        return b + a[ov:]
+    return None
+
+def _fit(text: str, budget: int, count_tokens) -> str:
+    """Longest word-boundary prefix of `text` within `budget` tokens."""
+    words = text.split(" ")
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(words[:mid]) + " …") <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo]) + " …" if lo else ""
+
+def compact_context(hits: list, max_tokens: int = 1500, count_tokens=estimate_tokens, min_tail_tokens: int = 50):
+    """
+    Merges, de-duplicates and budgets `hits` ([{"text", "source"}] in relevance order); returns hits in the same
+    form and order. A merged block takes the rank of its best member. The last block that does not fit is cut at a
+    word boundary if at least `min_tail_tokens` remain, otherwise dropped.
+    """
+    blocks = []
+    for hit in hits:
+        text, source = hit["text"].strip(), hit.get("source", "unknown")
+        if not text or any(near_duplicate(text, b["text"]) for b in blocks):
+            continue
+        target = None
+        for block in blocks:
+            if block["source"] == source:
+                merged = _merge(block["text"], text)
+                if merged is not None:
+                    block["text"], target = merged, block
+                    break
+        if target is None:
+            blocks.append({"text": text, "source": source})
+            continue
+        # the grown block may now bridge to a lower-ranked block of the same source
+        for other in [b for b in blocks if b is not target and b["source"] == source]:
+            merged = _merge(target["text"], other["text"])
+            if merged is not None:
+                target["text"] = merged
+                blocks.remove(other)
+
+    out, used = [], 0
+    for block in blocks:
+        cost = count_tokens(block["text"])
+        if used + cost <= max_tokens:
+            out.append(block)
+            used += cost
+            continue
+        if max_tokens - used >= min_tail_tokens:
+            text = _fit(block["text"], max_tokens - used, count_tokens)
+            if text:
+                out.append({"text": text, "source": block["source"]})
+        break
+    return out
+
+def format_context(hits: list) -> str:
+    return "\n\n".join(f"[{i+1}] ({h['source']})\n{h['text']}" for i, h in enumerate(hits))
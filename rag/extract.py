@@ -0,0 +1,123 @@
+# rag/extract.py
+"""
+HTML -> text extraction shared by the monitor, ingestion and the web tool.
+
+Backends:
+- "lxml":   libxml2's tokenizer driving a parser target, so no tree is ever built (fastest; needs lxml)
+- "stream": the standard library's html.parser tokenizer driving the same target (no tree, no extra deps)
+- "bs4":    the original BeautifulSoup path; also used whenever CSS selectors must be removed first
+- "auto":   lxml if installed, otherwise stream
+All of them produce the same blocks: text grouped by its nearest block-level element, script/style skipped.
+"""
+from html.parser import HTMLParser
+from rag.utils import clean_text
+
+try:
+    from lxml import etree
+except ImportError:  # optional, "stream" is used instead
+    etree = None
+
+# Text is grouped by its nearest ancestor with one of these tags, so every heading, paragraph,
+# list item and table row becomes its own block. Layout containers catch loose text in div-heavy pages.
+BLOCK_TAGS = {
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "tr", "dt", "dd", "blockquote", "pre",
+    "figcaption", "caption", "summary", "label", "button",
+    "div", "section", "article", "header", "footer", "main", "nav", "aside", "form", "ul", "ol", "table", "body",
+    "title",
+}
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+# Bump whenever a change above (or in the parsers) alters the blocks produced for the same HTML:
+# the monitor stores it with every snapshot and re-baselines pages extracted by another version.
+EXTRACTOR_VERSION = 2
+BACKENDS = ("auto", "lxml", "stream", "bs4")
+
+class _BlockCollector:
+    """Parser target: splits character data into blocks at every block tag and drops skipped elements."""
+
+    def __init__(self):
+        self.blocks, self.parts, self.skip_depth = [], [], 0
+
+    def _flush(self):
+        if self.parts:
+            block = clean_text(" ".join(self.parts))
+            if block: self.blocks.append(block)
+            self.parts = []
+
+    def start(self, tag, attrib=None):
+        tag = tag.lower() if isinstance(tag, str) else tag
+        if tag in SKIP_TAGS: self.skip_depth += 1
+        elif tag in BLOCK_TAGS and not self.skip_depth: self._flush()
+
+    def end(self, tag):
+        tag = tag.lower() if isinstance(tag, str) else tag
+        if tag in SKIP_TAGS: self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in BLOCK_TAGS and not self.skip_depth: self._flush()
+
+    def data(self, text):
+        if not self.skip_depth: self.parts.append(text)
+
+    def close(self):
+        self._flush()
+        return self.blocks
+
+class _StreamParser(HTMLParser):
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs): self.target.start(tag)
+    def handle_endtag(self, tag): self.target.end(tag)
+    def handle_startendtag(self, tag, attrs): pass  # self-closing tags carry no text
+    def handle_data(self, data): self.target.data(data)
+
+def _lxml_blocks(html: str):
+    collector = _BlockCollector()
+    parser = etree.HTMLParser(target=collector, remove_comments=True, remove_pis=True)
+    parser.feed(html)
+    return parser.close()
+
+def _stream_blocks(html: str):
+    collector = _BlockCollector()
+    parser = _StreamParser(collector)
+    parser.feed(html)
+    parser.close()
+    return collector.close()
+
+def _bs4_blocks(html: str, ignore_selectors=()):
+    from bs4 import BeautifulSoup, NavigableString
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(list(SKIP_TAGS)): tag.decompose()
+    for selector in ignore_selectors:
+        for tag in soup.select(selector): tag.decompose()
+    blocks, current_owner, parts = [], None, []
+    for string in soup.find_all(string=True):
+        if type(string) is not NavigableString: continue  # skips comments, doctype, CDATA
+        owner = string.parent
+        while owner is not None and owner.name not in BLOCK_TAGS: owner = owner.parent
+        if owner is not current_owner:
+            block = clean_text(" ".join(parts))
+            if block: blocks.append(block)
+            current_owner, parts = owner, []
+        parts.append(string)
+    block = clean_text(" ".join(parts))
+    if block: blocks.append(block)
+    return blocks
+
+def resolve_backend(backend: str = "auto"):
+    if backend not in BACKENDS: raise ValueError(f"Unknown extraction backend {backend!r}; choose from {BACKENDS}")
+    if backend == "auto": return "lxml" if etree is not None else "stream"
+    if backend == "lxml" and etree is None: raise ImportError("The lxml backend needs `pip install lxml`.")
+    return backend
+
+def extract_blocks(html: str, backend: str = "auto", ignore_selectors=None) -> list:
+    """Cleaned text blocks (headings, paragraphs, list items, table rows...) in document order."""
+    if not html: return []
+    if ignore_selectors: return _bs4_blocks(html, ignore_selectors)  # CSS selectors need a tree
+    backend = resolve_backend(backend)
+    if backend == "lxml": return _lxml_blocks(html)
+    if backend == "stream": return _stream_blocks(html)
+    return _bs4_blocks(html)
+
+def extract_text(html: str, backend: str = "auto") -> str:
+    """Visible page text as one whitespace-collapsed string."""
+    return " ".join(extract_blocks(html, backend))
@@ -0,0 +1,91 @@
+# rag/http_client.py
+"""
+Shared HTTP client for the monitor, ingestion and the web tool.
+One requests.Session with keep-alive connection pools per host (so TLS sessions are reused),
+gzip/deflate (+ brotli when installed) negotiation, retries with jittered exponential backoff,
+a per-host request rate limit and a cap on response body size.
+"""
+import time
+import random
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes "br" when brotli or brotlicffi is installed)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+class ResponseTooLarge(requests.RequestException):
+    """Raised when a body exceeds the client's max_bytes; a RequestException so callers' handlers catch it."""
+
+def _retry_policy(retries: int, backoff: float):
+    kwargs = dict(total=retries, connect=retries, read=retries, status=retries, backoff_factor=backoff,
+                  status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset({"GET", "HEAD"}),
+                  respect_retry_after_header=True, raise_on_status=False)
+    try:
+        return Retry(backoff_jitter=backoff, **kwargs)
+    except TypeError:  # urllib3 < 2 has no jitter option
+        return Retry(**kwargs)
+
+class HttpClient:
+    def __init__(self, retries: int = 3, backoff: float = 0.5, min_interval_per_host: float = 0.2,
+                 max_bytes: int = 10 * 2**20, timeout: float = 15, pool_hosts: int = 32, pool_per_host: int = 8,
+                 user_agent: str = DEFAULT_USER_AGENT):
+        self.min_interval, self.max_bytes, self.timeout = min_interval_per_host, max_bytes, timeout
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": user_agent, "Accept-Encoding": ACCEPT_ENCODING})
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_per_host,
+                              max_retries=_retry_policy(retries, backoff))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._next_slot, self._lock = {}, threading.Lock()
+
+    def _wait_for_host(self, url: str):
+        """Spaces requests to one host at least `min_interval` apart (with a little jitter), across threads."""
+        if self.min_interval <= 0: return
+        host, now = urlparse(url).netloc, time.monotonic()
+        with self._lock:
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval * random.uniform(1.0, 1.2)
+        if slot > now: time.sleep(slot - now)
+
+    def get(self, url: str, headers: dict | None = None, timeout: float | None = None):
+        """GET with the shared pools and policies. The body is read eagerly but never beyond max_bytes."""
+        self._wait_for_host(url)
+        response = self.session.get(url, headers=headers, timeout=timeout or self.timeout, stream=True)
+        try:
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                raise ResponseTooLarge(f"{url} declares {declared} bytes (limit {self.max_bytes})")
+            body, size = [], 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise ResponseTooLarge(f"{url} is larger than {self.max_bytes} bytes")
+                body.append(chunk)
+            response._content = b"".join(body)
+        finally:
+            response.close()  # returns the connection to the pool
+        return response
+
+_default_client, _default_lock = None, threading.Lock()
+
+def get_client() -> HttpClient:
+    """The process-wide client, created on first use."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None: _default_client = HttpClient()
+        return _default_client
+
+def http_get(url: str, headers: dict | None = None, timeout: float | None = None):
+    return get_client().get(url, headers=headers, timeout=timeout)
@@ -1,111 +1,391 @@
 # rag/ingest.py (Memory-Efficient Version)
 
 import os
+import time
+import json
+import hashlib
 import argparse
-import uuid
-import requests
-from bs4 import BeautifulSoup
-from pypdf import PdfReader
+import threading
+import multiprocessing
+import numpy as np
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from sentence_transformers import SentenceTransformer
 import chromadb
 from chromadb.config import Settings
-from rag.utils import clean_text, chunk_text
+from rag.utils import clean_text, iter_chunks, BOUNDARIES
+from rag.pdf import iter_pdf_pages, PdfReader, PARALLEL_MIN_PAGES
+from rag.extract import extract_blocks
+from rag.http_client import http_get
+from rag.query_cache import bump_version
+from rag.vectors import VectorStore, DTYPES, quantize, dequantize, recall_at_k
 
-def read_url(url: str) -> str:
+# Per-source record (content hash, ETag/Last-Modified or mtime/size, chunker, chunk IDs) kept next to the database.
+MANIFEST_FILE = "ingest_manifest.json"
+LEGACY_CHUNKER = "chars:800:100:None"  # what entries written before the chunker was recorded were chunked with
+
+def read_url_if_changed(url: str, entry: dict | None = None):
+    """
+    Conditionally fetches a URL using the ETag/Last-Modified/body hash recorded in its manifest entry.
+    Returns (status, text, entry) with status "changed", "unchanged" or "error"; unchanged pages are not parsed.
+    """
+    entry = entry or {}
     try:
-        r = requests.get(url, timeout=15, headers={"User-Agent":"Mozilla/5.0"})
+        headers = {}
+        if entry.get("etag"): headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+        r = http_get(url, headers=headers, timeout=15)
+        if r.status_code == 304:
+            return "unchanged", None, entry
         r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        for tag in soup(["script", "style", "noscript"]):
-            tag.decompose()
-        text = soup.get_text(separator=" ")
-        return clean_text(text)
+        new_entry = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified"),
+                     "content_hash": hashlib.sha256(r.content).hexdigest()}
+        if new_entry["content_hash"] == entry.get("content_hash"):
+            return "unchanged", None, {**entry, **new_entry}
+        return "changed", "\n\n".join(extract_blocks(r.text)), new_entry  # blocks kept apart for paragraph chunking
     except Exception as e:
         print(f"[ERROR] Failed to fetch {url}: {e}")
-        return None
+        return "error", None, entry
+
+def read_url(url: str) -> str:
+    return read_url_if_changed(url)[1]
 
 def read_pdf(path: str) -> str:
     try:
-        reader = PdfReader(path)
-        text = " ".join([p.extract_text() or "" for p in reader.pages])
-        return clean_text(text)
+        return clean_text(" ".join(text for _, text in iter_pdf_pages(path)))
     except Exception as e:
         print(f"[ERROR] Failed to read {path}: {e}")
         return None
 
-def main(persist_dir: str, urls_file: str | None, pdf_dir: str | None):
+def list_sources(urls_file: str | None, pdf_dir: str | None):
+    """Every URL in `urls_file` and PDF in `pdf_dir`, as {"source", "kind", "location"} dicts."""
+    sources = []
+    if urls_file and os.path.exists(urls_file):
+        with open(urls_file, "r", encoding="utf-8") as f:
+            sources += [{"source": u.strip(), "kind": "url", "location": u.strip()} for u in f if u.strip()]
+    if pdf_dir and os.path.isdir(pdf_dir):
+        sources += [{"source": name, "kind": "pdf", "location": os.path.join(pdf_dir, name)}
+                    for name in sorted(os.listdir(pdf_dir)) if name.lower().endswith(".pdf")]
+    return sources
+
+def chunk_id(source: str, chunk: str) -> str:
+    """Deterministic chunk ID: re-ingesting the same content yields the same ID, so writes are idempotent."""
+    return hashlib.sha256(f"{source}\0{chunk}".encode("utf-8")).hexdigest()
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def chunk_options(encoder, boundary: str = "sentence", max_chars: int = 800, overlap: int = 100):
+    """
+    iter_chunks options for ingestion. Boundary-aware chunks are also capped at the encoder's max_seq_length, counted
+    with its own tokenizer, so the model never silently truncates a chunk.
+    """
+    options = {"boundary": boundary, "max_chars": max_chars, "overlap": overlap}
+    if boundary != "chars":
+        tokenizer, lock = encoder.tokenizer, threading.Lock()  # fast tokenizers must not be shared across threads
+        def count_tokens(text):
+            with lock:
+                return len(tokenizer.tokenize(text))
+        options.update(max_tokens=encoder.max_seq_length - 2, count_tokens=count_tokens)  # room for [CLS] and [SEP]
+    return options
+
+def chunker_signature(chunking: dict) -> str:
+    return ":".join(str(chunking.get(k, d)) for k, d in
+                    (("boundary", "chars"), ("max_chars", 800), ("overlap", 100), ("max_tokens", None)))
+
+def _iter_source_chunks(src: dict, pieces, entry: dict, chunking: dict):
+    """Chunks (id, text, metadata) of one source, recording their IDs in entry["chunk_ids"] as they are produced."""
+    entry["chunk_ids"], seen = [], set()
+    for chunk, first, last in iter_chunks(pieces, **chunking):
+        cid = chunk_id(src["source"], chunk)
+        if cid in seen:
+            continue
+        seen.add(cid)
+        entry["chunk_ids"].append(cid)
+        meta = {"source": src["source"], "kind": src["kind"]}
+        if first is not None:
+            meta.update(page=first, page_end=last)
+        yield cid, chunk, meta
+
+def load_source(src: dict, entry: dict | None = None, pdf_pool=None, pdf_window: int = 4, chunking: dict | None = None):
+    """
+    Checks one source against its manifest `entry`.
+    Returns {"status": "changed" | "unchanged" | "error", "chunks": iterable of (id, text, metadata), "entry": new entry}.
+    Small PDFs are parsed and chunked right here, on the caller's loader thread. Large ones (PARALLEL_MIN_PAGES pages
+    and up) are a lazy stream: their pages are extracted (on `pdf_pool` if given) only as the caller consumes them,
+    and the entry's "chunk_ids" is complete once the stream is exhausted. A source chunked with other `chunking`
+    options than recorded in its entry is always reloaded.
+    """
+    chunking = chunking or {}
+    signature = chunker_signature(chunking)
+    entry = entry or {}
+    if entry and entry.get("chunker", LEGACY_CHUNKER) != signature:
+        entry = {}
+    if src["kind"] == "url":
+        status, txt, new_entry = read_url_if_changed(src["location"], entry)
+        if status != "changed":
+            return {"status": status, "chunks": [], "entry": new_entry}
+        new_entry["chunker"] = signature
+        chunks = list(_iter_source_chunks(src, [(None, txt)], new_entry, chunking))
+        return {"status": "changed", "chunks": chunks, "entry": new_entry}
+
+    try:
+        st = os.stat(src["location"])
+        new_entry = {"mtime": st.st_mtime, "size": st.st_size}
+        if entry.get("mtime") == st.st_mtime and entry.get("size") == st.st_size:
+            return {"status": "unchanged", "chunks": [], "entry": entry}
+        new_entry["content_hash"] = _file_hash(src["location"])
+    except OSError as e:
+        print(f"[ERROR] Failed to read {src['location']}: {e}")
+        return {"status": "error", "chunks": [], "entry": entry}
+    if new_entry["content_hash"] == entry.get("content_hash"):
+        return {"status": "unchanged", "chunks": [], "entry": {**entry, **new_entry}}
+    new_entry["chunker"] = signature
+    reader = PdfReader(src["location"])
+    small = len(reader.pages) < PARALLEL_MIN_PAGES
+    chunks = _iter_source_chunks(src, iter_pdf_pages(src["location"], pool=pdf_pool, window=pdf_window, reader=reader),
+                                 new_entry, chunking)
+    del reader
+    # Draining small PDFs here keeps their parsing concurrent across load_sources' threads; large ones stay lazy
+    # so that at most a few page ranges of each are held in memory.
+    return {"status": "changed", "chunks": list(chunks) if small else chunks, "entry": new_entry}
+
+def load_manifest(persist_dir: str):
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(persist_dir: str, manifest: dict):
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(f"{path}.tmp", path)
+
+def _load_with_source(src: dict, manifest: dict, **kwargs):
+    try:
+        return src, load_source(src, manifest.get(src["source"]), **kwargs)
+    except Exception as e:  # one broken source must not end the whole run
+        print(f"[ERROR] Failed to load {src['location']}: {e}")
+        return src, {"status": "error", "chunks": [], "entry": manifest.get(src["source"]) or {}}
+
+def load_sources(sources: list, manifest: dict, workers: int = 8, **kwargs):
+    """
+    Loads sources on a thread pool and yields (src, load_source result) as each one finishes. At most 2 * workers sources
+    are in flight, so network and parsing keep running while the caller embeds without loading everything at once.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending, queued = set(), iter(sources)
+        for src in islice(queued, 2 * workers):
+            pending.add(pool.submit(_load_with_source, src, manifest, **kwargs))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                for src in islice(queued, 1):
+                    pending.add(pool.submit(_load_with_source, src, manifest, **kwargs))
+
+class Embedder:
+    """
+    Normalized float32 embeddings from `encoder`. With processes > 1 the texts are split across a pool of worker
+    processes (one model copy each, cores shared out between them) instead of a single process using all threads.
+    """
+
+    def __init__(self, encoder, processes: int = 1):
+        self.encoder, self.processes, self.pool = encoder, max(1, processes), None
+        if self.processes > 1:
+            threads = str(max(1, (os.cpu_count() or 1) // self.processes))
+            saved = {k: os.environ.get(k) for k in ("OMP_NUM_THREADS", "MKL_NUM_THREADS")}
+            os.environ.update({k: threads for k in saved})  # inherited by the spawned workers only
+            try:
+                self.pool = encoder.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+            finally:
+                for k, v in saved.items():
+                    if v is None: os.environ.pop(k, None)
+                    else: os.environ[k] = v
+
+    def encode(self, texts: list) -> np.ndarray:
+        if self.pool is None:
+            return np.asarray(self.encoder.encode(texts, batch_size=64, normalize_embeddings=True,
+                                                  show_progress_bar=False), dtype=np.float32)
+        chunk_size = max(1, -(-len(texts) // self.processes))
+        emb = np.asarray(self.encoder.encode_multi_process(texts, self.pool, batch_size=64, chunk_size=chunk_size),
+                         dtype=np.float32)
+        norms = np.linalg.norm(emb, axis=1, keepdims=True)
+        return emb / np.where(norms == 0, 1, norms)
+
+    def close(self):
+        if self.pool is not None:
+            self.encoder.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+class EmbeddingBatcher:
+    """
+    Collects chunks across documents and embeds/writes them in fixed-size batches to every store in `stores`.
+    Keeps up to `sample_size` float32 embeddings for the quantization recall check.
+    """
+
+    def __init__(self, stores: list, embedder: Embedder, batch_size: int = 256, sample_size: int = 5000):
+        self.stores, self.embedder, self.batch_size = stores, embedder, batch_size
+        self.ids, self.texts, self.metadatas, self.written = [], [], [], 0
+        self.sample, self.sample_size, self.encode_seconds = [], sample_size, 0.0
+
+    def add(self, chunks: list):
+        for cid, text, meta in chunks:
+            self.ids.append(cid); self.texts.append(text); self.metadatas.append(meta)
+        while len(self.texts) >= self.batch_size:
+            self.flush(self.batch_size)
+
+    def flush(self, n: int | None = None):
+        n = len(self.texts) if n is None else n
+        if n == 0:
+            return
+        ids, texts, metadatas = self.ids[:n], self.texts[:n], self.metadatas[:n]
+        del self.ids[:n], self.texts[:n], self.metadatas[:n]
+        started = time.perf_counter()
+        emb = self.embedder.encode(texts)
+        self.encode_seconds += time.perf_counter() - started
+        for store in self.stores:
+            store.upsert(documents=texts, metadatas=metadatas, ids=ids, embeddings=emb.tolist())
+        room = self.sample_size - sum(len(s) for s in self.sample)
+        if room > 0:
+            self.sample.append(emb[:room])
+        self.written += n
+        print(f"  -> Embedded and stored a batch of {n} chunks ({self.written} total)")
+
+def check_recall(sample: list, dtype: str, k: int = 10):
+    """recall@k of `dtype`-quantized vectors against float32 on the embeddings sampled this run; None if too few."""
+    if not sample or sum(len(s) for s in sample) <= k:
+        return None
+    reference = np.vstack(sample)
+    return recall_at_k(reference, dequantize(*quantize(reference, dtype)), k=k)
+
+def main(persist_dir: str, urls_file: str | None, pdf_dir: str | None, workers: int = 8, batch_size: int = 256,
+         prune: bool = False, encode_processes: int = 1, vector_store: str = "chroma", vector_dtype: str | None = None,
+         pdf_processes: int = 0, chunking: str = "sentence", chunk_chars: int = 800, chunk_overlap: int = 100):
     print("\n\n✅✅✅ WE ARE RUNNING THE CORRECT SCRIPT! ✅✅✅\n\n")
-    print("Initializing ChromaDB and Sentence Transformer model...")
+    print("Initializing vector store and Sentence Transformer model...")
     os.makedirs(persist_dir, exist_ok=True)
-    client = chromadb.PersistentClient(path=persist_dir, settings=Settings(allow_reset=True))
-    col = client.get_or_create_collection("docs")
+    stores = []
+    if vector_store in ("chroma", "both"):
+        client = chromadb.PersistentClient(path=persist_dir, settings=Settings(allow_reset=True))
+        stores.append(client.get_or_create_collection("docs"))
+    compact = None
+    if vector_store in ("compact", "both"):
+        compact = VectorStore(os.path.join(persist_dir, "vectors"), dtype=vector_dtype)
+        stores.append(compact)
     encoder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-    print("Initialization complete.")
+    embedder = Embedder(encoder, processes=encode_processes or os.cpu_count() or 1)
+    pdf_processes = pdf_processes or os.cpu_count() or 1
+    # spawn, not fork: the parent is multi-threaded by the time the first large PDF arrives
+    pdf_pool = ProcessPoolExecutor(pdf_processes, mp_context=multiprocessing.get_context("spawn")) \
+        if pdf_processes > 1 else None
+    print(f"Initialization complete ({embedder.processes} encoding process(es), {pdf_processes} PDF process(es)).")
 
-    total_chunks_ingested = 0
+    sources = list_sources(urls_file, pdf_dir)
+    manifest = load_manifest(persist_dir)
+    batcher = EmbeddingBatcher(stores, embedder, batch_size=batch_size)
+    chunk_opts = chunk_options(encoder, chunking, chunk_chars, chunk_overlap)
+    started, documents, skipped, deleted = time.perf_counter(), 0, 0, 0
 
-    # Process URLs
-    if urls_file and os.path.exists(urls_file):
-        with open(urls_file, "r", encoding="utf-8") as f:
-            for url in f:
-                url = url.strip()
-                if not url:
-                    continue
-                
-                print(f"\n--- Processing URL: {url} ---")
-                txt = read_url(url)
-                if not txt:
-                    continue
-
-                chunks = chunk_text(txt)
-                if not chunks:
-                    print("No text chunks generated.")
-                    continue
-                    
-                ids = [str(uuid.uuid4()) for _ in chunks]
-                metadatas = [{"source": url, "kind": "url"} for _ in chunks]
-                
-                print(f"Embedding and adding {len(chunks)} chunks to the database...")
-                emb = encoder.encode(chunks, normalize_embeddings=True, show_progress_bar=True).tolist()
-                col.add(documents=chunks, metadatas=metadatas, ids=ids, embeddings=emb)
-                total_chunks_ingested += len(chunks)
-                print(f"Successfully added chunks for {url}")
-
-    # Process PDFs
-    if pdf_dir and os.path.isdir(pdf_dir):
-        for name in os.listdir(pdf_dir):
-            if not name.lower().endswith(".pdf"):
+    def delete(**kwargs):
+        for store in stores:
+            store.delete(**kwargs)
+
+    try:
+        for src, result in load_sources(sources, manifest, workers=workers, pdf_pool=pdf_pool,
+                                        pdf_window=2 * pdf_processes, chunking=chunk_opts):
+            name, old_entry = src["source"], manifest.get(src["source"])
+            if result["status"] == "error":
                 continue
-            
-            path = os.path.join(pdf_dir, name)
-            print(f"\n--- Processing PDF: {name} ---")
-            txt = read_pdf(path)
-            if not txt:
+            if result["status"] == "unchanged":
+                skipped += 1
+                manifest[name] = result["entry"]
                 continue
 
-            chunks = chunk_text(txt)
-            if not chunks:
-                print("No text chunks generated.")
-                continue
+            old_ids = set(old_entry.get("chunk_ids", [])) if old_entry else set()
+            if old_entry is None:
+                delete(where={"source": name})  # chunks from runs before the manifest existed had random IDs
+            fresh = 0
+            try:
+                for chunk in result["chunks"]:
+                    if chunk[0] not in old_ids:
+                        batcher.add([chunk])
+                        fresh += 1
+            except Exception as e:
+                print(f"[ERROR] Failed to read {src['location']}: {e}")
+                continue  # manifest entry left as it was, so the source is retried next run
+            documents += 1
+            new_ids = set(result["entry"]["chunk_ids"])
+            if old_ids - new_ids:
+                delete(ids=list(old_ids - new_ids))
+                deleted += len(old_ids - new_ids)
+            print(f"--- Loaded {src['kind'].upper()}: {name} ({fresh} new, {len(old_ids - new_ids)} removed, "
+                  f"{len(new_ids) - fresh} unchanged chunks) ---")
+            manifest[name] = result["entry"]
 
-            ids = [str(uuid.uuid4()) for _ in chunks]
-            metadatas = [{"source": name, "kind": "pdf"} for _ in chunks]
-            
-            print(f"Embedding and adding {len(chunks)} chunks to the database...")
-            emb = encoder.encode(chunks, normalize_embeddings=True, show_progress_bar=True).tolist()
-            col.add(documents=chunks, metadatas=metadatas, ids=ids, embeddings=emb)
-            total_chunks_ingested += len(chunks)
-            print(f"Successfully added chunks for {name}")
+        if prune:
+            listed = {src["source"] for src in sources}
+            for name in [n for n in manifest if n not in listed]:
+                stale = manifest.pop(name).get("chunk_ids", [])
+                if stale:
+                    delete(ids=stale)
+                deleted += len(stale)
+                print(f"--- Pruned {name} ({len(stale)} chunks) ---")
+        batcher.flush()
+    finally:
+        embedder.close()
+        if pdf_pool is not None:
+            pdf_pool.shutdown(cancel_futures=True)
+    if compact is not None:
+        compact.save()
+    save_manifest(persist_dir, manifest)
+    if documents or deleted or batcher.written:
+        bump_version(persist_dir)  # invalidates cached retrieval results
 
-    if total_chunks_ingested == 0:
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"\n{skipped} source(s) unchanged and skipped, {deleted} stale chunk(s) deleted.")
+    if batcher.written == 0 and stores[0].count() == 0:
         print("\nNo documents were found or processed. The database might be empty.")
     else:
-        print(f"\n✅ Ingestion complete. Total chunks added: {total_chunks_ingested}. Persisted to {persist_dir}")
+        print(f"\n✅ Ingestion complete. {documents} changed document(s), {batcher.written} chunks embedded in {elapsed:.1f}s "
+              f"({documents / elapsed:.2f} docs/s, {batcher.written / elapsed:.1f} chunks/s, "
+              f"{batcher.written / max(batcher.encode_seconds, 1e-9):.1f} chunks/s while encoding). Persisted to {persist_dir}")
+    if compact is not None:
+        recall = check_recall(batcher.sample, compact.dtype)
+        print(f"Compact store: {compact.count()} vectors as {compact.dtype}, {compact.nbytes() / 2**20:.1f} MiB"
+              + (f", recall@10 vs float32 {recall:.3f} on {sum(len(s) for s in batcher.sample)} new chunks"
+                 if recall is not None else ""))
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--persist_dir", default="./db")
     ap.add_argument("--urls", default="domain/demo/seed_urls.txt")
     ap.add_argument("--pdf_dir", default="domain/demo/seed_pdfs")
+    ap.add_argument("--workers", type=int, default=8, help="Sources fetched/parsed concurrently.")
+    ap.add_argument("--batch_size", type=int, default=256,
+                    help="Chunks per embedding batch and database write (use >= 64 per encoding process).")
+    ap.add_argument("--prune", action="store_true", help="Delete chunks of sources no longer listed in --urls/--pdf_dir.")
+    ap.add_argument("--encode_processes", type=int, default=1,
+                    help="Processes used to compute embeddings; 0 uses one per CPU core.")
+    ap.add_argument("--pdf_processes", type=int, default=0,
+                    help="Processes extracting pages of large PDFs; 0 uses one per CPU core, 1 reads them in-process.")
+    ap.add_argument("--chunking", choices=BOUNDARIES, default="sentence",
+                    help="chars: fixed slices (the original chunker); sentence/paragraph: whole sentences or paragraphs, "
+                         "within the model's token limit. Changing it re-chunks every source on the next run.")
+    ap.add_argument("--chunk_chars", type=int, default=800, help="Maximum characters per chunk.")
+    ap.add_argument("--chunk_overlap", type=int, default=100, help="Characters of context repeated between chunks.")
+    ap.add_argument("--vector_store", choices=("chroma", "compact", "both"), default="chroma",
+                    help="Where embeddings go: Chroma (float32), the compact store in <persist_dir>/vectors, or both.")
+    ap.add_argument("--vector_dtype", choices=DTYPES, default=None,
+                    help="Element type of the compact store (default: keep the current one, float16 for a new store).")
     args = ap.parse_args()
-    main(args.persist_dir, args.urls, args.pdf_dir)
\ No newline at end of file
+    main(args.persist_dir, args.urls, args.pdf_dir, workers=args.workers, batch_size=args.batch_size, prune=args.prune,
+         encode_processes=args.encode_processes, vector_store=args.vector_store, vector_dtype=args.vector_dtype,
+         pdf_processes=args.pdf_processes, chunking=args.chunking, chunk_chars=args.chunk_chars,
+         chunk_overlap=args.chunk_overlap)
@@ -0,0 +1,46 @@
+# rag/pdf.py
+"""
+Page-by-page PDF text extraction. Page text is returned as extracted (line and paragraph breaks intact, for the
+chunker). Kept free of the embedding/database imports so that worker processes only load pypdf.
+"""
+from collections import deque
+from itertools import islice
+from pypdf import PdfReader
+
+PAGES_PER_TASK = 8       # pages extracted per worker task
+PARALLEL_MIN_PAGES = 32  # smaller PDFs are read in-process; starting workers costs more than it saves
+
+def _extract_pages(path: str, start: int, stop: int):
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def iter_pdf_pages(path: str, pool=None, window: int = 4, reader: PdfReader | None = None):
+    """
+    Yields (page number starting at 1, page text) in page order. With a process `pool`, large PDFs are
+    extracted in ranges of PAGES_PER_TASK pages across the workers, with at most `window` ranges in flight,
+    so memory stays bounded by a few ranges of text rather than the whole document. An already opened `reader`
+    of `path` can be passed in to avoid parsing the file structure twice.
+    """
+    reader = reader or PdfReader(path)
+    n_pages = len(reader.pages)
+    if pool is None or n_pages < PARALLEL_MIN_PAGES:
+        for i, page in enumerate(reader.pages):
+            yield i + 1, page.extract_text() or ""
+        return
+    del reader
+
+    starts = iter(range(0, n_pages, PAGES_PER_TASK))
+    submit = lambda start: pool.submit(_extract_pages, path, start, min(start + PAGES_PER_TASK, n_pages))
+    pending = deque(submit(start) for start in islice(starts, max(1, window)))
+    page_no = 1
+    try:
+        while pending:
+            texts = pending.popleft().result()
+            for start in islice(starts, 1):
+                pending.append(submit(start))
+            for text in texts:
+                yield page_no, text
+                page_no += 1
+    finally:
+        for future in pending:
+            future.cancel()
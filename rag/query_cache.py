@@ -0,0 +1,67 @@
+# rag/query_cache.py
+import os
+import uuid
+import threading
+from collections import OrderedDict
+
+# Written by ingestion whenever it changes the collection; retrieval results are cached per version.
+VERSION_FILE = "collection_version"
+
+_versions = {}  # path -> (stat signature, version), so each query costs one stat() instead of a read
+
+def read_version(persist_dir: str) -> str:
+    path = os.path.join(persist_dir, VERSION_FILE)
+    try:
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_ino, st.st_size)  # bump_version replaces the file, so the inode changes too
+        cached = _versions.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            version = f.read().strip()
+    except OSError:
+        return "0"
+    _versions[path] = (signature, version)
+    return version
+
+def bump_version(persist_dir: str) -> str:
+    version = uuid.uuid4().hex
+    path = os.path.join(persist_dir, VERSION_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(f"{path}.tmp", path)
+    return version
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation differences map to the same cache entry."""
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+class LRUCache:
+    """Thread-safe in-memory LRU with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._items, self._lock = OrderedDict(), threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._items),
+                    "hit_rate": self.hits / total if total else 0.0}
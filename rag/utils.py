@@ -1,5 +1,6 @@
 # rag/utils.py (Corrected Version with Bug Fix)
 import re
+from collections import deque
 
 def clean_text(text: str) -> str:
     """Removes extra whitespace from text."""
@@ -31,4 +32,129 @@ def chunk_text(text: str, max_chars: int = 800, overlap: int = 100):
         chunks.append(chunk)
         start += step
         
-    return chunks
\ No newline at end of file
+    return chunks
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+BOUNDARIES = ("chars", "sentence", "paragraph")
+
+def iter_chunks(pieces, max_chars: int = 800, overlap: int = 100, sep: str = " ", boundary: str = "chars",
+                max_tokens: int | None = None, count_tokens=None):
+    """
+    Streaming chunker. `pieces` is an iterable of (label, text), e.g. (page number, page text), which are cleaned and
+    joined with `sep`. Yields (chunk, first label, last label) while holding only the current piece and the
+    unfinished chunk in memory.
+
+    boundary="chars" gives exactly chunk_text's fixed slices of the joined text. "sentence" and "paragraph" pack whole
+    sentences (or blank-line separated paragraphs) up to `max_chars` and, given `count_tokens`, `max_tokens`;
+    `overlap` then carries up to that many characters of trailing sentences into the next chunk. Units too big for a
+    chunk on their own are split into sentences, then words, then characters.
+    """
+    if boundary == "chars":
+        yield from _iter_char_chunks(((label, clean_text(text)) for label, text in pieces), max_chars, overlap, sep)
+    elif boundary in BOUNDARIES:
+        yield from _iter_unit_chunks(pieces, max_chars, overlap, sep, boundary, max_tokens, count_tokens)
+    else:
+        raise ValueError(f"Unknown chunk boundary {boundary!r}; choose from {BOUNDARIES}")
+
+def _iter_char_chunks(pieces, max_chars: int, overlap: int, sep: str):
+    step = max_chars - overlap
+    if step <= 0:
+        raise ValueError("max_chars must be greater than overlap to avoid an infinite loop.")
+
+    buf, pos, offset = "", 0, 0  # buf[pos:] is unchunked text; offset is buf's position in the joined text
+    spans = deque()  # (start in joined text, label) of every piece still overlapping buf[pos:]
+
+    def label_at(i):
+        found = spans[0][1]
+        for start, label in spans:
+            if start > i:
+                break
+            found = label
+        return found
+
+    def emit(chunk):
+        start = offset + pos
+        return chunk, label_at(start), label_at(start + len(chunk) - 1)
+
+    for label, text in pieces:
+        if not text:
+            continue
+        buf, offset, pos = buf[pos:], offset + pos, 0
+        if spans:
+            buf += sep
+        spans.append((offset + len(buf), label))
+        buf += text
+        while len(buf) - pos >= max_chars:
+            yield emit(buf[pos:pos + max_chars])
+            pos += step
+            while len(spans) > 1 and spans[1][0] <= offset + pos:
+                spans.popleft()
+    while pos < len(buf):
+        yield emit(buf[pos:pos + max_chars])
+        pos += step
+        while len(spans) > 1 and spans[1][0] <= offset + pos:
+            spans.popleft()
+
+def _split_to_fit(unit: str, max_chars: int, max_tokens: int | None, count, level: int = 0):
+    """Yields (part, tokens): `unit` itself if it fits in one chunk, else its sentences, words or halves that do."""
+    tokens = count(unit) if max_tokens is not None else 0
+    if len(unit) <= max_chars and (max_tokens is None or tokens <= max_tokens):
+        yield unit, tokens
+        return
+    while level < 2:
+        parts = (SENTENCE_END if level == 0 else re.compile(r" ")).split(unit)
+        level += 1
+        if len(parts) > 1:
+            for part in parts:
+                yield from _split_to_fit(part, max_chars, max_tokens, count, level)
+            return
+    if len(unit) > 1:
+        mid = len(unit) // 2
+        yield from _split_to_fit(unit[:mid], max_chars, max_tokens, count, level)
+        yield from _split_to_fit(unit[mid:], max_chars, max_tokens, count, level)
+    else:
+        yield unit, tokens
+
+def _iter_unit_chunks(pieces, max_chars: int, overlap: int, sep: str, boundary: str, max_tokens: int | None, count_tokens):
+    if max_tokens is not None and count_tokens is None:
+        raise ValueError("max_tokens needs a count_tokens function")
+    current = deque()  # (text, label, tokens) of the chunk being built
+    size = {"chars": 0, "tokens": 0}
+    fresh = False      # whether `current` holds anything not yet emitted
+
+    def fits(part, n):
+        return (size["chars"] + len(sep) * bool(current) + len(part) <= max_chars
+                and (max_tokens is None or size["tokens"] + n <= max_tokens))
+
+    def drop_first():
+        text, _, n = current.popleft()
+        size["chars"] -= len(text) + len(sep) * bool(current)
+        size["tokens"] -= n
+
+    for label, text in pieces:
+        for block in (PARAGRAPH_BREAK.split(text) if boundary == "paragraph" else [text]):
+            block = clean_text(block)
+            for unit in ([block] if boundary == "paragraph" else SENTENCE_END.split(block)):
+                if not unit:
+                    continue
+                for part, n in _split_to_fit(unit, max_chars, max_tokens, count_tokens):
+                    if current and not fits(part, n):
+                        if fresh:
+                            yield sep.join(u[0] for u in current), current[0][1], current[-1][1]
+                        # keep the trailing units within `overlap` chars as context, then make room for `part`
+                        kept, keep = 0, 0
+                        for unit_text, _, _ in reversed(current):
+                            kept += len(unit_text) + len(sep)
+                            if kept > overlap:
+                                break
+                            keep += 1
+                        while len(current) > keep or (current and not fits(part, n)):
+                            drop_first()
+                        fresh = False
+                    size["chars"] += len(sep) * bool(current) + len(part)
+                    size["tokens"] += n
+                    current.append((part, label, n))
+                    fresh = True
+    if fresh:
+        yield sep.join(u[0] for u in current), current[0][1], current[-1][1]
@@ -0,0 +1,239 @@
+# rag/vectors.py
+"""
+Compact vector store: all embeddings in one contiguous, memory-mapped NumPy matrix stored as float32,
+float16 or int8 (with a float32 scale per row), plus a JSON-lines file with each row's id, source and text.
+It mirrors the small part of the Chroma collection API that ingestion uses (upsert / delete / count).
+"""
+import io
+import os
+import json
+from itertools import islice
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+
+def quantize(emb: np.ndarray, dtype: str):
+    """Returns (matrix, scales); scales is None except for int8, where each row is scaled to use [-127, 127]."""
+    emb = np.asarray(emb, dtype=np.float32)
+    if dtype == "float32": return emb, None
+    if dtype == "float16": return emb.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(emb).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(emb / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    raise ValueError(f"Unknown vector dtype {dtype!r}; choose from {DTYPES}")
+
+def dequantize(matrix: np.ndarray, scales: np.ndarray | None):
+    out = np.asarray(matrix, dtype=np.float32)
+    return out * scales[:, None] if scales is not None else out
+
+def recall_at_k(reference: np.ndarray, approx: np.ndarray, k: int = 10, n_queries: int = 200, seed: int = 0,
+                queries: np.ndarray | None = None, noise: float = 0.5):
+    """
+    Share of the exact float32 top-k neighbours (by `reference`) that `approx` also returns in its top-k.
+    Pass held-out `queries` when you have them; otherwise random reference rows are perturbed by Gaussian noise
+    of norm about `noise` and renormalized, so no query is a stored row that trivially finds itself first.
+    """
+    n = len(reference)
+    if n <= 1: return 1.0
+    k = min(k, n - 1)
+    rng = np.random.default_rng(seed)
+    if queries is None:
+        queries = reference[rng.choice(n, size=min(n_queries, n), replace=False)]
+        queries = queries + rng.standard_normal(queries.shape).astype(np.float32) * (noise / np.sqrt(queries.shape[1]))
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    exact = np.argpartition(-(queries @ reference.T), k, axis=1)[:, :k]
+    found = np.argpartition(-(queries @ approx.T), k, axis=1)[:, :k]
+    return float(np.mean([len(set(e) & set(f)) / k for e, f in zip(exact, found)]))
+
+def _append_npy(path: str, array: np.ndarray):
+    """
+    Appends rows to a C-ordered .npy file in place: the data goes after the existing bytes, then the header's row
+    count is updated. Returns False (file untouched) when the header cannot be rewritten at the same length.
+    """
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        if version not in ((1, 0), (2, 0)): return False
+        read, write = ((np.lib.format.read_array_header_1_0, np.lib.format.write_array_header_1_0) if version == (1, 0)
+                       else (np.lib.format.read_array_header_2_0, np.lib.format.write_array_header_2_0))
+        shape, fortran, dtype = read(f)
+        header_len = f.tell()
+        if fortran or dtype != array.dtype or shape[1:] != array.shape[1:]: return False
+        header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+                  "shape": (shape[0] + len(array),) + shape[1:]}
+        buf = io.BytesIO()
+        write(buf, header)
+        if buf.tell() != header_len: return False
+        f.truncate(header_len + shape[0] * dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64)))
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(array).tobytes())
+        f.flush()
+        f.seek(0)
+        f.write(buf.getvalue())
+    return True
+
+class VectorStore:
+    """
+    Rows are only ever appended on save(): deleted or replaced rows stay in the files as tombstones (row positions
+    listed in meta.json) until they make up COMPACT_RATIO of the store, or the dtype changes, and everything is
+    rewritten. meta.json is replaced last and its "count" bounds what readers load, so a save in progress (or an
+    interrupted one) is never visible.
+    """
+    COMPACT_RATIO = 0.25
+
+    def __init__(self, path: str, dtype: str | None = None):
+        """`dtype` None keeps the stored type (float16 for a new store); a different one converts the store on save()."""
+        if dtype is not None and dtype not in DTYPES: raise ValueError(f"Unknown vector dtype {dtype!r}; choose from {DTYPES}")
+        self.path, self.dtype, self._stored_dtype = path, dtype or "float16", None
+        self.matrix, self.scales, self.rows, self.dead = None, None, [], set()
+        self._pending, self._deleted, self._torn = {}, set(), False
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f: meta = json.load(f)
+            self.dtype = dtype or meta["dtype"]
+            self._stored_dtype, count = meta["dtype"], meta["count"]
+            self.matrix = np.load(os.path.join(path, "matrix.npy"), mmap_mode="r")
+            scales_path = os.path.join(path, "scales.npy")
+            self.scales = np.load(scales_path) if meta["dtype"] == "int8" else None
+            with open(os.path.join(path, "rows.jsonl"), "r", encoding="utf-8") as f:
+                self.rows = [json.loads(line) for line in islice(f, count)]
+                # anything past "count" is a save in progress or an interrupted one, which the next save rewrites
+                self._torn = bool(f.read(1)) or len(self.matrix) != count
+            self.matrix = self.matrix[:count]
+            if self.scales is not None: self.scales = self.scales[:count]
+            self.dead = set(meta.get("dead", []))
+
+    def count(self):
+        return len(self._live_ids())
+
+    def live_rows(self):
+        """Positions of the stored rows that are neither tombstoned nor deleted/replaced since the last save."""
+        return [i for i, r in enumerate(self.rows) if i not in self.dead and r["id"] not in self._deleted]
+
+    def _live_ids(self):
+        return {self.rows[i]["id"] for i in self.live_rows()} | set(self._pending)
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        for cid, text, meta, emb in zip(ids, documents, metadatas, embeddings):
+            self._pending[cid] = ({"id": cid, "text": text, **meta}, np.asarray(emb, dtype=np.float32))
+            self._deleted.add(cid)  # supersedes a stored row with the same id
+
+    add = upsert
+
+    def delete(self, ids=None, where=None):
+        ids = set(ids or [])
+        if where and "source" in where:
+            ids |= {r["id"] for r in self.rows if r.get("source") == where["source"]}
+            ids |= {cid for cid, (row, _) in self._pending.items() if row.get("source") == where["source"]}
+        for cid in ids:
+            self._pending.pop(cid, None)
+            self._deleted.add(cid)
+
+    def save(self):
+        """Appends new rows (or rewrites the store when compacting or converting), then publishes them via meta.json."""
+        keep = self.live_rows()
+        dead = set(range(len(self.rows))) - set(keep)
+        total = len(self.rows) + len(self._pending)
+        if (self.matrix is None or not len(self.rows) or self._torn or self.dtype != self._stored_dtype
+                or len(dead) > self.COMPACT_RATIO * total or not self._append()):
+            self._rewrite(keep)
+        else:
+            self.rows += [row for row, _ in self._pending.values()]
+            self.matrix = np.load(os.path.join(self.path, "matrix.npy"), mmap_mode="r")
+            if self.scales is not None: self.scales = np.load(os.path.join(self.path, "scales.npy"))
+            self.dead = dead
+            self._write_meta(sorted(dead))
+        self._pending, self._deleted = {}, set()
+
+    def _append(self):
+        """Appends the pending rows to the files; returns False (nothing written) if the matrix cannot be extended."""
+        if not self._pending: return True
+        new = np.stack([emb for _, emb in self._pending.values()])
+        if new.shape[1] != self.matrix.shape[1]: return False
+        matrix, scales = quantize(new, self.dtype)
+        path = os.path.join(self.path, "matrix.npy")
+        self.matrix = None  # release the memory map before growing its file (required on Windows)
+        appended = _append_npy(path, matrix)
+        if not appended:
+            self.matrix = np.load(path, mmap_mode="r")[:len(self.rows)]
+            return False
+        # written by the same np.save as matrix.npy, so its header can be extended too
+        if scales is not None and not _append_npy(os.path.join(self.path, "scales.npy"), scales):
+            raise RuntimeError(f"Could not extend {self.path}/scales.npy")
+        with open(os.path.join(self.path, "rows.jsonl"), "a", encoding="utf-8") as f:
+            for row, _ in self._pending.values(): f.write(json.dumps(row) + "\n")
+        return True
+
+    def _rewrite(self, keep: list):
+        """Writes kept + new rows to fresh files and swaps them in, so readers never see a half-written index."""
+        kept = dequantize(self.matrix[keep], self.scales[keep] if self.scales is not None else None) \
+            if self.matrix is not None and keep else np.zeros((0, 0), dtype=np.float32)
+        new = np.stack([emb for _, emb in self._pending.values()]) if self._pending else None
+        if new is not None: full = new if kept.size == 0 else np.vstack([kept, new])
+        else: full = kept
+        rows = [self.rows[i] for i in keep] + [row for row, _ in self._pending.values()]
+        matrix, scales = quantize(full, self.dtype) if len(rows) else (np.zeros((0, 0), dtype=np.float32), None)
+
+        os.makedirs(self.path, exist_ok=True)
+        self.matrix = None  # release the old memory map before replacing its file (required on Windows)
+        for name, array in (("matrix.npy", matrix), ("scales.npy", scales)):
+            target = os.path.join(self.path, name)
+            if array is None:
+                if os.path.exists(target): os.remove(target)
+                continue
+            with open(f"{target}.tmp", "wb") as f: np.save(f, array)
+            os.replace(f"{target}.tmp", target)
+        with open(os.path.join(self.path, "rows.jsonl.tmp"), "w", encoding="utf-8") as f:
+            for row in rows: f.write(json.dumps(row) + "\n")
+        os.replace(os.path.join(self.path, "rows.jsonl.tmp"), os.path.join(self.path, "rows.jsonl"))
+        self.rows, self.dead = rows, set()
+        self._write_meta([], dim=int(matrix.shape[1]) if len(rows) else 0)
+        self.matrix = np.load(os.path.join(self.path, "matrix.npy"), mmap_mode="r")
+        self.scales, self._stored_dtype, self._torn = scales, self.dtype, False
+
+    def _write_meta(self, dead: list, dim: int | None = None):
+        if dim is None: dim = int(self.matrix.shape[1])
+        meta_path = os.path.join(self.path, "meta.json")
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "count": len(self.rows), "dim": dim, "dead": dead}, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def nbytes(self):
+        return 0 if self.matrix is None else self.matrix.nbytes + (0 if self.scales is None else self.scales.nbytes)
+
+class VectorIndex:
+    """
+    Exact top-k search over a saved VectorStore: one matrix product plus argpartition per batch of queries.
+    float32 stores without tombstones are searched straight from the memory map; others are loaded into RAM once.
+    """
+
+    def __init__(self, path: str):
+        store = VectorStore(path)
+        live = store.live_rows()
+        self.dtype, self.rows = store.dtype, [store.rows[i] for i in live]
+        if store.matrix is None or not live:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+        elif store.dtype == "float32" and len(live) == len(store.rows):
+            self.matrix = store.matrix
+        else:  # dropping tombstoned rows also means a copy in RAM
+            scales = store.scales[live] if store.scales is not None else None
+            self.matrix = np.ascontiguousarray(dequantize(store.matrix[live], scales))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search_many(self, queries, k: int = 4):
+        """For each query vector, [(row index, score)] of its k nearest rows, best first."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, len(self.rows))
+        if k == 0:
+            return [[] for _ in queries]
+        scores = queries @ self.matrix.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+        return [list(zip(row.tolist(), s.tolist())) for row, s in zip(top, top_scores)]
+
+    def search(self, query, k: int = 4):
+        return self.search_many([query], k)[0]
@@ -0,0 +1,130 @@
+# router.py
+"""
+Fast-path tool routing for agent.run: pattern rules for arithmetic, URLs and greetings, then (opt-in) a
+nearest-exemplar classifier over MiniLM embeddings. Only when neither is confident does the agent fall back to the
+LLM planner. Check the classifier's accuracy and thresholds on your own questions with benchmarks/bench_router.py
+before turning it on.
+"""
+import re
+import numpy as np
+
+# --- Rules ---
+URL_RE = re.compile(r"https?://[^\s<>\"')\]]+")
+EXPR_RE = re.compile(r"[\d.()+\-*/x×÷ ]*\d[\d.()+\-*/x×÷ ]*")
+OPERATOR_RE = re.compile(r"\d\s*\)?\s*[+\-*/x×÷]\s*\(?\s*[\d.(]")
+GREETING_RE = re.compile(r"^(hi|hello|hey|yo|thanks|thank you|thx|good (morning|afternoon|evening)|how are you)"
+                         r"( there| all| again| so much)?[\s!.?,]*$", re.I)
+# words that may surround an expression without making the question about anything else
+CALC_FILLER = {"what", "is", "whats", "what's", "calculate", "compute", "evaluate", "solve", "how", "much",
+               "please", "equals", "equal", "to", "the", "result", "of"}
+URL_FILLER = {"summarize", "summarise", "summary", "read", "fetch", "open", "get", "what", "does", "say", "is", "on",
+              "of", "this", "page", "the", "at", "please", "tldr", "tl;dr", "check", "describe", "explain"}
+
+def _only_filler(text: str, filler: set) -> bool:
+    return all(w in filler for w in re.findall(r"[\w;']+", text.lower()))
+
+def rule_route(query: str):
+    """A decision dict when a rule matches unambiguously, else None."""
+    q = query.strip()
+    if GREETING_RE.match(q):
+        return {"tool": "none", "args": "", "reason": "greeting"}
+    urls = URL_RE.findall(q)
+    if len(urls) == 1 and _only_filler(URL_RE.sub(" ", q), URL_FILLER):
+        return {"tool": "web", "args": urls[0].rstrip(".,;:!?"), "reason": "bare URL"}
+    exprs = [e.strip() for e in EXPR_RE.findall(q) if OPERATOR_RE.search(e)]
+    if len(exprs) == 1 and _only_filler(q.replace(exprs[0], " ").replace("=", " ").replace("?", " "), CALC_FILLER):
+        expr = exprs[0].replace("x", "*").replace("×", "*").replace("÷", "/")
+        return {"tool": "calc", "args": expr, "reason": "arithmetic expression"}
+    return None
+
+# --- Embedding classifier ---
+EXEMPLARS = {
+    "vector_search": [
+        "What does our documentation say about this?",
+        "According to our knowledge base, how does the feature work?",
+        "Summarize the topic in our local knowledge",
+        "Find the section of the manual about configuration",
+        "What is our internal policy on refunds?",
+        "Search our docs for the installation steps",
+        "What do the ingested PDFs say about pricing?",
+    ],
+    "wiki": [
+        "Who was Albert Einstein?",
+        "What is the capital of Australia?",
+        "Tell me about the history of the Roman Empire",
+        "When did World War II end?",
+        "What is photosynthesis?",
+        "Give me facts about the Eiffel Tower",
+        "Who invented the telephone?",
+    ],
+    "none": [
+        "Write a short poem about autumn",
+        "Rephrase this sentence to sound more formal",
+        "Tell me a joke",
+        "Translate 'good night' into French",
+        "Say hello in one line.",
+        "Draft a polite email declining a meeting",
+        "Give me three name ideas for a coffee shop",
+    ],
+}
+
+class Router:
+    """
+    Picks a tool without an LLM call when confident. Rules always apply; the embedding classifier only with
+    `use_embeddings`. `min_score` is the cosine similarity the best exemplar must reach and `min_margin` how far
+    ahead of the best exemplar of any other tool it must be.
+    """
+
+    def __init__(self, exemplars: dict = EXEMPLARS, min_score: float = 0.5, min_margin: float = 0.08, log=print,
+                 use_embeddings: bool = False):
+        self.exemplars, self.min_score, self.min_margin, self.log = exemplars, min_score, min_margin, log
+        self.use_embeddings = use_embeddings
+        self._labels, self._matrix, self._encoder = None, None, None
+
+    def _exemplar_matrix(self, encoder):
+        if self._matrix is None or self._encoder is not encoder:
+            labels = [tool for tool, texts in self.exemplars.items() for _ in texts]
+            texts = [text for texts in self.exemplars.values() for text in texts]
+            self._matrix = np.asarray(encoder.encode(texts, normalize_embeddings=True), dtype=np.float32)
+            self._labels, self._encoder = labels, encoder
+        return self._labels, self._matrix
+
+    def classify(self, query_embedding, encoder):
+        """(tool, best score, margin over the best other tool)."""
+        labels, matrix = self._exemplar_matrix(encoder)
+        scores = matrix @ np.asarray(query_embedding, dtype=np.float32)
+        best = {}
+        for label, score in zip(labels, scores.tolist()):
+            best[label] = max(best.get(label, -1.0), score)
+        ranked = sorted(best.items(), key=lambda kv: kv[1], reverse=True)
+        margin = ranked[0][1] - ranked[1][1] if len(ranked) > 1 else ranked[0][1]
+        return ranked[0][0], ranked[0][1], margin
+
+    def route(self, query: str, retriever, fallback):
+        """
+        Decision dict as returned by agent.plan(), plus "route" ("rule", "embedding" or "planner") and "confidence".
+        The query embedding comes from the retriever's cache, so a vector_search decision costs no second encode.
+        """
+        decision = rule_route(query)
+        if decision is not None:
+            decision.update(route="rule", confidence=1.0)
+        elif self.use_embeddings:
+            decision = self._embedding_route(query, retriever, fallback)
+        else:
+            decision = {**fallback(query), "route": "planner", "confidence": 0.0}
+        self.log(f"[router] {decision['tool']} via {decision['route']} (confidence {decision['confidence']:.2f}): {query[:80]!r}")
+        return decision
+
+    def _embedding_route(self, query: str, retriever, fallback):
+        try:
+            tool, score, margin = self.classify(retriever.embed_query(query), retriever.encoder)
+        except Exception as e:  # a failing encoder must not fail the question: the planner still works
+            decision = {**fallback(query), "route": "planner", "confidence": 0.0}
+            decision["reason"] = f"{decision['reason']} (router failed: {e})"
+            return decision
+        if score >= self.min_score and margin >= self.min_margin:
+            return {"tool": tool, "args": query if tool == "wiki" else "",
+                    "reason": f"closest to {tool} examples", "route": "embedding", "confidence": score}
+        decision = {**fallback(query), "route": "planner", "confidence": score}
+        decision["reason"] = f"{decision['reason']} (router unsure: {tool} {score:.2f}, margin {margin:.2f})"
+        return decision
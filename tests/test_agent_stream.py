@@ -0,0 +1,59 @@
+import threading
+import time
+import pytest
+
+agent = pytest.importorskip("agent")
+
+def test_run_stream_yields_plan_tool_tokens_then_answer(monkeypatch):
+    monkeypatch.setattr(agent, "plan", lambda q: {"tool": "calc", "args": "6*7", "reason": "math"})
+    monkeypatch.setattr(agent, "call_llm_stream", lambda prompt, model: iter(["The answer ", "is 42."]))
+
+    events = list(agent.run_stream("six times seven", retriever=None, router=None))
+    assert [e["type"] for e in events] == ["plan", "tool", "token", "token", "answer"]
+    assert events[1]["result"] == "42"
+    assert events[-1]["answer"] == "The answer is 42." and events[-1]["first_token_seconds"] is not None
+    assert agent.run("six times seven", retriever=None, router=None) == {
+        "tool": "calc", "answer": "The answer is 42.", "sources": [], "route": "planner"}
+
+def test_speculative_mode_reuses_the_matching_tool(monkeypatch):
+    searched = []
+
+    class FakeRetriever:
+        def search(self, query, k=4):
+            searched.append(query)
+            return [{"text": "local", "source": "kb.pdf"}]
+
+    monkeypatch.setattr(agent, "search_wiki", lambda q: f"wiki: {q}")
+    # planning takes a moment, as the LLM call does, so the speculative tasks are running by the time it decides
+    monkeypatch.setattr(agent, "plan", lambda q: time.sleep(0.05) or {"tool": "vector_search", "args": "", "reason": "docs"})
+    monkeypatch.setattr(agent, "call_llm_stream", lambda prompt, model: iter(["ok"]))
+
+    answer = list(agent.run_stream("refund policy", FakeRetriever(), router=None, speculative=True))[-1]
+    assert searched == ["refund policy"] and answer["sources"] == ["kb.pdf"]
+    assert answer["speculation"]["used"] == "vector_search"
+    assert set(answer["speculation"]["started"]) == {"wiki", "vector_search"}
+    assert set(answer["timings"]) == {"plan", "tool", "first_token", "answer"}
+
+    # a rule-routed query starts nothing
+    monkeypatch.setattr(agent, "plan", lambda q: {"tool": "calc", "args": "1+1", "reason": "math"})
+    assert list(agent.run_stream("1+1", FakeRetriever(), router=None, speculative=True))[-1]["speculation"] is None
+
+def test_speculation_is_bounded_per_request(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(agent, "search_wiki", lambda q: release.wait() and f"wiki: {q}")
+    try:
+        # abandoned lookups occupy every worker: later queries start nothing instead of queueing behind them
+        abandoned = [agent.Speculation(f"q{i}", None) for i in range(agent.SPECULATION_WORKERS)]
+        late = agent.Speculation("late", None)
+        assert late.tasks == {} and late.take("wiki", "") is None
+
+        # a started lookup is waited for only until the request's deadline
+        release.set()
+        for s in abandoned: s.tasks["wiki"].result()
+        release.clear()
+        slow = agent.Speculation("slow", None, max_seconds=0.05)
+        started = time.perf_counter()
+        assert slow.take("wiki", "") is None and time.perf_counter() - started < 1
+        assert slow.discard()["used"] is None
+    finally:
+        release.set()
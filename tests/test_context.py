@@ -0,0 +1,24 @@
+from rag.context import compact_context, format_context, overlap_length
+from rag.utils import chunk_text
+
+def test_overlapping_chunks_merge_and_duplicates_drop():
+    text = " ".join(f"word{i}" for i in range(400))
+    first, second, third = chunk_text(text, max_chars=800, overlap=100)[:3]
+    hits = [
+        {"text": third, "source": "manual.pdf"},
+        {"text": "An unrelated passage about pricing tiers and seats.", "source": "pricing.html"},
+        {"text": first, "source": "manual.pdf"},
+        {"text": second, "source": "manual.pdf"},  # bridges first and third
+        {"text": "an unrelated passage about pricing tiers and seats", "source": "copy.html"},
+    ]
+    assert overlap_length(first, second) == 100
+    out = compact_context(hits)
+    assert [h["source"] for h in out] == ["manual.pdf", "pricing.html"]
+    assert out[0]["text"] == text[:len(out[0]["text"])] and len(out[0]["text"]) == 2 * 700 + 800
+    assert format_context(out).startswith("[1] (manual.pdf)\nword0 ") and "\n\n[2] (pricing.html)\n" in format_context(out)
+
+def test_budget_cuts_the_last_block_at_a_word():
+    hits = [{"text": "alpha " * 100, "source": "a"}, {"text": "beta " * 400, "source": "b"}, {"text": "gamma", "source": "c"}]
+    out = compact_context(hits, max_tokens=300)
+    assert [h["source"] for h in out] == ["a", "b"]
+    assert out[1]["text"].endswith(" …") and sum(len(h["text"]) for h in out) <= 1200
@@ -0,0 +1,32 @@
+import json
+from monitoring.digest import DigestState
+
+def _append(path, competitor, title, timestamp):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({"timestamp": timestamp, "competitor": competitor,
+                            "summary": {"change_detected": True, "change_title": title}}) + "\n")
+
+def test_digest_reads_only_new_log_lines(tmp_path):
+    config, log = tmp_path / "competitors.json", tmp_path / "summary_log.jsonl"
+    config.write_text(json.dumps([{"name": "Acme_Pricing"}, {"name": "Beta_Homepage"}]))
+    _append(log, "Acme_Pricing", "Price cut", "2026-01-01")
+    state = DigestState(str(config), str(log))
+    md = state.render()
+    assert "**Price cut**" in md and "No significant changes detected." in md
+    offset = state.offset
+
+    _append(log, "Beta_Homepage", "New hero", "2026-01-02")
+    with open(log, 'a', encoding='utf-8') as f: f.write('{"partial')
+    state.sections["Acme"] = "CACHED\n"
+    md = state.render()
+    assert "**New hero**" in md and "CACHED" in md  # Acme was not re-rendered
+    assert offset < state.offset < log.stat().st_size
+
+def test_digest_reads_incrementally_from_summary_store(tmp_path):
+    from monitoring.summary_store import SummaryStore
+    config, db = tmp_path / "competitors.json", tmp_path / "s.db"
+    config.write_text(json.dumps([{"name": "Acme_Pricing"}]))
+    state = DigestState(str(config), str(tmp_path / "missing.jsonl"), db_path=str(db))
+    assert "No significant changes detected." in state.render()
+    with SummaryStore(str(db)) as store: store.add("Acme_Pricing", {"change_detected": True, "change_title": "Price cut"})
+    assert "**Price cut**" in state.render() and state.offset == 1
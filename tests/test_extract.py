@@ -0,0 +1,18 @@
+import pytest
+from rag.extract import extract_blocks, extract_text
+
+PAGE = """<!doctype html><html><head><title>Pricing</title><style>p { color: red }</style></head>
+<body><!-- nav --><div>Plans <b>for</b> teams<p>Pro &amp; Team</p>tail</div>
+<ul><li>Free<li>Pro $10</ul><script>var price = 99;</script>
+<table><tr><td>Seats</td><td>5</td></tr></table><noscript>Enable JS</noscript></body></html>"""
+
+EXPECTED = ["Pricing", "Plans for teams", "Pro & Team", "tail", "Free", "Pro $10", "Seats 5"]
+
+@pytest.mark.parametrize("backend", ["stream", "lxml", "bs4"])
+def test_backends_produce_the_same_blocks(backend):
+    pytest.importorskip({"lxml": "lxml", "bs4": "bs4"}.get(backend, "html.parser"))
+    assert extract_blocks(PAGE, backend) == EXPECTED
+
+def test_extract_text_joins_blocks():
+    assert extract_text(PAGE, "stream") == " ".join(EXPECTED)
+    assert extract_text("", "stream") == ""
@@ -0,0 +1,43 @@
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+pytest.importorskip("requests")
+from rag.http_client import HttpClient, ResponseTooLarge
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        body = b"x" * (5000 if self.path == "/big" else 100)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_response(200); self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args): pass
+
+@pytest.fixture()
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.connections, srv.url = set(), f"http://127.0.0.1:{srv.server_port}"  # per server, so tests stay independent
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+
+def test_client_reuses_connections_and_decodes_gzip(server):
+    client = HttpClient(min_interval_per_host=0)
+    for _ in range(5):
+        assert client.get(f"{server.url}/page").text == "x" * 100
+    assert len(server.connections) == 1
+
+def test_client_enforces_max_body_size(server):
+    client = HttpClient(min_interval_per_host=0, max_bytes=1000)
+    with pytest.raises(ResponseTooLarge):
+        client.get(f"{server.url}/big")
@@ -0,0 +1,62 @@
+import os
+import threading
+import pytest
+
+ingest = pytest.importorskip("rag.ingest")
+
+def _pdf(tmp_path, name):
+    path = tmp_path / name
+    path.write_text("3")  # a placeholder, read by FakeReader below rather than by pypdf
+    return {"kind": "pdf", "location": str(path), "source": name}
+
+class FakeReader:
+    """Stands in for pypdf.PdfReader: the placeholder file holds the page count."""
+
+    class Page:
+        def __init__(self, text): self.text = text
+        def extract_text(self): return self.text
+
+    def __init__(self, path):
+        with open(path, "r", encoding="utf-8") as f: n = int(f.read())
+        self.pages = [self.Page(f"Page {i + 1} of {os.path.basename(path)}.") for i in range(n)]
+
+@pytest.fixture()
+def fake_pdfs(monkeypatch):
+    monkeypatch.setattr(ingest, "PdfReader", FakeReader)
+
+def test_load_sources_isolates_a_failing_source(tmp_path, monkeypatch, fake_pdfs):
+    real = ingest.load_source
+    def flaky(src, entry=None, **kwargs):
+        if src["source"] == "bad.pdf": raise RuntimeError("corrupt file")
+        return real(src, entry, **kwargs)
+    monkeypatch.setattr(ingest, "load_source", flaky)
+    sources = [_pdf(tmp_path, f"{name}.pdf") for name in ("a", "bad", "b")]
+    manifest = {"bad.pdf": {"chunk_ids": ["kept"]}}
+    results = {src["source"]: result for src, result in ingest.load_sources(sources, manifest, workers=2)}
+    assert results["bad.pdf"]["status"] == "error" and results["bad.pdf"]["entry"] == manifest["bad.pdf"]
+    assert results["a.pdf"]["status"] == results["b.pdf"]["status"] == "changed"
+
+def test_load_sources_skips_sources_recorded_in_the_manifest(tmp_path, monkeypatch):
+    src, moved = _pdf(tmp_path, "same.pdf"), _pdf(tmp_path, "moved.pdf")
+    st, signature = os.stat(src["location"]), ingest.chunker_signature({})
+    manifest = {
+        "same.pdf": {"mtime": st.st_mtime, "size": st.st_size, "chunker": signature, "chunk_ids": ["x"]},
+        # touched (other mtime) but with identical content: still not re-read
+        "moved.pdf": {"mtime": 0, "size": 1, "content_hash": ingest._file_hash(moved["location"]),
+                      "chunker": signature, "chunk_ids": ["y"]},
+    }
+    monkeypatch.setattr(ingest, "iter_pdf_pages", lambda *a, **k: pytest.fail("unchanged PDF was parsed"))
+    results = {s["source"]: r for s, r in ingest.load_sources([src, moved], manifest, workers=2)}
+    assert results["same.pdf"] == {"status": "unchanged", "chunks": [], "entry": manifest["same.pdf"]}
+    assert results["moved.pdf"]["status"] == "unchanged" and results["moved.pdf"]["entry"]["chunk_ids"] == ["y"]
+
+def test_small_pdfs_are_parsed_concurrently_on_the_loader_threads(tmp_path, monkeypatch, fake_pdfs):
+    both_parsing = threading.Barrier(2, timeout=5)  # breaks unless two PDFs are being parsed at the same time
+    def fake_pages(path, pool=None, window=4, reader=None):
+        both_parsing.wait()
+        yield 1, f"Text of {os.path.basename(path)}."
+    monkeypatch.setattr(ingest, "iter_pdf_pages", fake_pages)
+    sources = [_pdf(tmp_path, "a.pdf"), _pdf(tmp_path, "b.pdf")]
+    results = [result for _, result in ingest.load_sources(sources, {}, workers=2)]
+    assert [r["status"] for r in results] == ["changed", "changed"]
+    assert all(isinstance(r["chunks"], list) and r["chunks"] and r["entry"]["chunk_ids"] for r in results)
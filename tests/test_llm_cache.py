@@ -0,0 +1,13 @@
+from monitoring.llm_cache import SummaryCache
+
+def test_summary_cache_hits_and_evicts(tmp_path):
+    cache = SummaryCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    key = SummaryCache.make_key("+ Pro plan  $10\n", "phi3", "v1")
+    assert key == SummaryCache.make_key("+ Pro plan $10", "phi3", "v1")
+    assert key != SummaryCache.make_key("+ Pro plan $10", "mistral:7b", "v1")
+    assert cache.get(key) is None
+    cache.put(key, {"change_detected": True})
+    assert cache.get(key) == {"change_detected": True}
+    cache.put("b", {}); cache.put("c", {})
+    assert cache.get(key) is None
+    assert cache.stats() == {"hits": 1, "misses": 2}
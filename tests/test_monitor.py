@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from collections import defaultdict
+import pytest
+
+monitor = pytest.importorskip("monitor")
+
+def test_fetch_all_caps_requests_per_host_and_keeps_config_order():
+    lock, active, peak = threading.Lock(), defaultdict(int), defaultdict(int)
+    def fake_download(url, validators=None):
+        host = url.split("/")[2]
+        with lock:
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+        time.sleep(0.02 if host == "a.com" else 0.005)
+        with lock:
+            active[host] -= 1
+        return "changed", url, {}
+
+    competitors = [{"name": f"{host}_{i}", "url": f"https://{host}/{i}"} for i in range(6) for host in ("a.com", "b.com")]
+    results = list(monitor.fetch_all(competitors, max_workers=4, per_host=2, fetch=fake_download))
+    assert [c["name"] for c, _ in results] == [c["name"] for c in competitors]
+    assert all(r[1] == c["url"] for c, r in results)
+    assert peak["a.com"] == 2 and peak["b.com"] == 2
+
+    peak.clear()
+    unordered = list(monitor.fetch_all(competitors, max_workers=4, per_host=1, ordered=False, fetch=fake_download))
+    assert sorted(c["name"] for c, _ in unordered) == sorted(c["name"] for c in competitors)
+    assert peak["a.com"] == 1 and peak["b.com"] == 1
+
+def test_detect_stage_rebaselines_snapshots_from_other_extraction_settings(tmp_path):
+    from monitoring.snapshots import SnapshotStore
+    store = SnapshotStore(str(tmp_path))
+    store.put("acme", "Pricing\nOld layout")  # a snapshot from before extraction settings were recorded
+    signature = monitor.extraction_signature(None, "stream")
+    item = lambda text: {"competitor": {"name": "acme"}, "status": "changed", "text": text, "validators": {}, "log": []}
+
+    first = monitor._detect_stage(item("Pricing\nNew layout"), store, {"acme": signature})
+    assert first["outcome"] == "rebaselined" and "diff_report" not in first
+    assert store.extractor("acme") == signature
+
+    second = monitor._detect_stage(item("Pricing\nNew price"), store, {"acme": signature})
+    assert second["outcome"] == "changed" and second["diff_report"]
+    assert monitor.extraction_signature(None, "stream") != monitor.extraction_signature(None, "bs4")
+
+def test_extract_stage_fails_only_the_page_that_cannot_be_extracted():
+    item = {"competitor": {"name": "acme"}, "status": "changed", "html": "<p>Hi</p>", "log": []}
+    bad_rules = {"acme": {"patterns": [], "selectors": ["div[class="]}}
+    assert monitor._extract_stage(dict(item), bad_rules, "stream")["status"] == "error"
+    assert monitor._extract_stage(dict(item, log=[]), {}, "stream")["text"] == "Hi"
+
+def _page(name, diff_report):
+    return {"item": {"competitor": {"name": name, "url": f"https://x.com/{name}"}, "log": []}, "name": name,
+            "url": f"https://x.com/{name}", "diff_report": diff_report}
+
+def test_plan_batches_splits_on_the_token_budget():
+    pages = [_page(f"acme_{i}", "x" * 396) for i in range(5)]  # 100 tokens each
+    assert [len(b) for b in monitor.plan_batches(pages, token_budget=250)] == [2, 2, 1]
+    assert [len(b) for b in monitor.plan_batches(pages, token_budget=1000)] == [5]
+    # a single page larger than the budget still gets a batch of its own
+    assert [len(b) for b in monitor.plan_batches([_page("big", "x" * 4000), pages[0]], token_budget=250)] == [1, 1]
+
+def _group(*names):
+    return [{"competitor": {"name": n, "url": f"https://x.com/{n}"}, "diff_report": f"+ new text on {n}", "log": []}
+            for n in names]
+
+SUMMARY = {"change_detected": True, "change_category": "Pricing", "change_title": "t", "update": "u",
+           "impact": "i", "analysis": "a"}
+
+def test_group_stage_serves_cached_pages_before_batching_the_rest(tmp_path, monkeypatch):
+    from monitoring.llm_cache import SummaryCache
+    cache = SummaryCache(str(tmp_path / "cache.sqlite3"))
+    group = _group("acme_a", "acme_b", "acme_c")
+    cache.put(SummaryCache.make_key(group[0]["diff_report"], "m", monitor.PROMPT_VERSION), dict(SUMMARY, change_title="cached"))
+    prompts = []
+    def fake_chat(model, system, user, on_token=None):
+        prompts.append(user)
+        return json.dumps({"pages": {"acme_b": SUMMARY, "acme_c": SUMMARY}})
+    monkeypatch.setattr(monitor, "_chat_json", fake_chat)
+
+    monitor._summarize_group_stage(group, "m", cache, token_budget=3000)
+    assert len(prompts) == 1 and "acme_a" not in prompts[0]
+    assert group[0]["summary"]["change_title"] == "cached" and group[1]["summary"] == SUMMARY
+    # the batched results are cached per page
+    assert cache.get(SummaryCache.make_key("+ new text on acme_c", "m", monitor.PROMPT_VERSION)) == SUMMARY
+    cache.close()
+
+def test_group_stage_falls_back_to_one_call_per_page_when_the_batch_is_invalid(monkeypatch):
+    monkeypatch.setattr(monitor, "_chat_json", lambda *a, **k: json.dumps({"pages": {"acme_a": SUMMARY}}))
+    single = []
+    def fake_single(old, new, url, model_to_use, diff_report=None, cache=None, log=print, on_token=None, cache_key=None):
+        single.append(url); return dict(SUMMARY, change_title=url)
+    monkeypatch.setattr(monitor, "summarize_change_with_ai", fake_single)
+
+    streams = []
+    stream = lambda name, pages=None: streams.append((name, pages)) or (lambda text: None)
+    group = monitor._summarize_group_stage(_group("acme_a", "acme_b"), "m", None, token_budget=3000, stream=stream)
+    assert single == ["https://x.com/acme_a", "https://x.com/acme_b"]
+    # the batch streams under the company, tagged with its pages; the fallback calls stream per page
+    assert streams == [("acme", ["acme_a", "acme_b"]), ("acme_a", None), ("acme_b", None)]
+    assert [item["summary"]["change_title"] for item in group] == single
+    assert any("Falling back" in line for line in group[0]["log"])
+
+def test_save_summary_to_log_keeps_the_database_next_to_the_log(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    log_file = tmp_path / "logs" / "acme.jsonl"
+    log_file.parent.mkdir()
+    monitor.save_summary_to_log(SUMMARY, "acme", log_file=str(log_file))
+    assert (tmp_path / "logs" / "acme.db").exists() and not (tmp_path / "summary_log.db").exists()
+
+def test_fetch_errors_are_logged_with_their_page(tmp_path, capsys):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = b"<p>Pricing</p>"
+            self.send_response(404 if self.path == "/missing" else 200)
+            self.send_header("Content-Length", str(len(body))); self.end_headers(); self.wfile.write(body)
+        def log_message(self, *args): pass
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_port}"
+    config = tmp_path / "competitors.json"
+    config.write_text(json.dumps([{"name": "acme_ok", "url": f"{base}/ok"}, {"name": "acme_gone", "url": f"{base}/missing"}]))
+    events = []
+    try:
+        monitor.run_monitor(str(config), str(tmp_path / "snapshots"), "m", None, llm_cache_path=None,
+                            summary_log_path=str(tmp_path / "log.jsonl"), on_event=events.append)
+    finally:
+        srv.shutdown()
+    out = capsys.readouterr().out
+    assert out.index("Checking: acme_gone") < out.index("Could not fetch URL")
+    page = next(e for e in events if e["type"] == "page" and e["name"] == "acme_gone")
+    assert page["status"] == "error" and "404" in page["error"]
+    assert (tmp_path / "log.db").exists()  # the summary index follows summary_log_path
+
+def test_batch_fallback_does_not_look_the_cache_up_twice(tmp_path, monkeypatch):
+    from monitoring.llm_cache import SummaryCache
+    cache = SummaryCache(str(tmp_path / "cache.sqlite3"))
+    replies = iter([json.dumps({"pages": {}}), json.dumps(SUMMARY), json.dumps(SUMMARY)])  # invalid batch, then per page
+    monkeypatch.setattr(monitor, "_chat_json", lambda *a, **k: next(replies))
+    group = monitor._summarize_group_stage(_group("acme_a", "acme_b"), "m", cache, token_budget=3000)
+    assert [item["summary"] for item in group] == [SUMMARY, SUMMARY]
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert cache.get(SummaryCache.make_key("+ new text on acme_b", "m", monitor.PROMPT_VERSION)) == SUMMARY
+    cache.close()
@@ -0,0 +1,26 @@
+import pytest
+from monitoring.normalize import compile_rules, normalize_blocks
+
+def test_volatile_content_is_normalized_but_prices_are_kept():
+    rules = compile_rules({"name": "Acme_Homepage", "ignore_patterns": [r"Deal ends in \S+"]})
+    blocks = ["Updated Oct 17, 2026 at 10:42 AM", "Trusted by 1,234,567 teams", "Pro $1,000 per month",
+              "build 3f9a1c2b4d5e6f708192", "Deal ends in 04h12m"]
+    assert normalize_blocks(blocks, rules) == [
+        "Updated <date> at <time>", "Trusted by <num> teams", "Pro $1,000 per month", "build <token>"]
+
+def test_counters_are_normalized_but_amounts_in_any_currency_are_not():
+    rules = compile_rules({"name": "Acme_Pricing"})
+    blocks = ["48213 downloads this week", "Join 12,000+ happy customers", "Enterprise 1,000 USD per seat",
+              "EUR 12,500 per year", "Starting at 12500 kr", "₹49,999 per month", "Pro plan 25000 JPY"]
+    assert normalize_blocks(blocks, rules) == [
+        "<num> downloads this week", "Join <num> happy customers", "Enterprise 1,000 USD per seat",
+        "EUR 12,500 per year", "Starting at 12500 kr", "₹49,999 per month", "Pro plan 25000 JPY"]
+
+def test_normalize_can_be_disabled_per_competitor():
+    assert normalize_blocks(["Posted 2026-10-17"], compile_rules({"normalize": False})) == ["Posted 2026-10-17"]
+
+@pytest.mark.parametrize("key,value", [("ignore_patterns", ["Deal ends in ("]), ("ignore_selectors", ["div[class="])])
+def test_invalid_rules_are_reported_with_the_competitor_name(key, value):
+    pytest.importorskip("soupsieve")
+    with pytest.raises(ValueError, match="Acme_Pricing"):
+        compile_rules({"name": "Acme_Pricing", key: value})
@@ -0,0 +1,36 @@
+import threading
+import pytest
+from monitoring.pipeline import Stage, run_pipeline
+
+def test_pipeline_runs_every_item_through_every_stage():
+    stages = [Stage("double", lambda x: x * 2, workers=3), Stage("inc", lambda x: x + 1)]
+    assert sorted(run_pipeline(range(20), stages)) == [x * 2 + 1 for x in range(20)]
+    assert [s.items for s in stages] == [20, 20]
+
+def test_pipeline_applies_backpressure_to_the_source():
+    release, produced = threading.Event(), []
+    def source():
+        for i in range(50):
+            produced.append(i); yield i
+    def slow(x):
+        release.wait(); return x
+    seen_while_blocked = []
+    def unblock():
+        seen_while_blocked.append(len(produced)); release.set()
+    results = run_pipeline(source(), [Stage("slow", slow, queue_size=2)])
+    threading.Timer(0.3, unblock).start()
+    assert next(results) == 0
+    assert seen_while_blocked[0] <= 4  # one item in the worker, two queued, one waiting to be put
+    assert len(list(results)) == 49
+
+def test_pipeline_reraises_stage_errors():
+    def boom(x):
+        raise RuntimeError("stage failed")
+    with pytest.raises(RuntimeError):
+        list(run_pipeline(range(5), [Stage("boom", boom)]))
+
+def test_pipeline_records_timings_on_batched_members():
+    stages = [Stage("pair", lambda x: [[{"n": x}, {"n": x + 1}]], fan_out=True),
+              Stage("batch", lambda group: group, fan_out=True)]
+    items = list(run_pipeline([0, 10], stages))
+    assert len(items) == 4 and all("batch" in item["timings"] for item in items)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from rag.query_cache import bump_version, read_version
+from rag.vectors import VectorStore
+
+agent = pytest.importorskip("agent")
+
+def test_retriever_loads_lazily_and_shares_models(monkeypatch, tmp_path):
+    loads = []
+    monkeypatch.setattr(agent, "_shared", {})
+    monkeypatch.setattr(agent, "_load_encoder", lambda name: loads.append(("encoder", name)) or object())
+    monkeypatch.setattr(agent, "_load_client", lambda path: loads.append(("client", path)) or object())
+
+    first, second = agent.Retriever(str(tmp_path)), agent.Retriever(str(tmp_path))
+    assert loads == []
+    assert first.encoder is second.encoder
+    assert loads == [("encoder", agent.EMBED_MODEL)]
+    first.warmup(background=False)  # collection load fails on the dummy client; warmup only warns
+    assert first.client is second.client and len(loads) == 2
+
+def test_search_caches_embeddings_and_results_per_collection_version(monkeypatch, tmp_path):
+    class Encoder:
+        calls, texts = 0, []
+        def encode(self, texts, **kwargs):
+            Encoder.calls += 1; Encoder.texts += texts
+            return np.ones((len(texts), 3))
+
+    class Collection:
+        queries = 0
+        def count(self): return 1
+        def query(self, **kwargs):
+            Collection.queries += 1
+            return {"documents": [["doc"]], "metadatas": [[{"source": "a.pdf"}]]}
+
+    monkeypatch.setattr(agent, "_shared", {})
+    monkeypatch.setattr(agent, "_load_encoder", lambda name: Encoder())
+    monkeypatch.setattr(agent, "get_collection", lambda persist_dir: Collection())
+    r = agent.Retriever(str(tmp_path))
+
+    assert r.search("What is the refund policy?") == [{"text": "doc", "source": "a.pdf"}]
+    assert r.search("  what is the REFUND policy ") == [{"text": "doc", "source": "a.pdf"}]
+    assert (Encoder.calls, Collection.queries) == (1, 1)
+    assert Encoder.texts == ["what is the refund policy"]  # the cached embedding is that of the normalized key
+
+    bump_version(str(tmp_path))  # what ingestion does after changing the collection
+    r.search("what is the refund policy")
+    assert (Encoder.calls, Collection.queries) == (1, 2)
+    assert r.cache_stats()["results"]["hits"] == 1 and r.cache_stats()["embeddings"]["hits"] == 1
+
+def test_read_version_rereads_only_after_a_bump(tmp_path, monkeypatch):
+    assert read_version(str(tmp_path)) == "0"
+    first = bump_version(str(tmp_path))
+    assert read_version(str(tmp_path)) == first
+    monkeypatch.setattr("builtins.open", lambda *a, **k: pytest.fail("unchanged version file was re-read"))
+    assert read_version(str(tmp_path)) == first
+    monkeypatch.undo()
+    second = bump_version(str(tmp_path))
+    assert second != first and read_version(str(tmp_path)) == second
+
+def test_numpy_backend_searches_the_compact_store(monkeypatch, tmp_path):
+    class Encoder:
+        def encode(self, texts, **kwargs):
+            return np.array([[1.0, 0.0] if "pricing" in t else [0.0, 1.0] for t in texts])
+
+    monkeypatch.setattr(agent, "_shared", {})
+    monkeypatch.setattr(agent, "_load_encoder", lambda name: Encoder())
+    store = VectorStore(str(tmp_path / "vectors"), dtype="int8")
+    store.upsert(ids=["a", "b", "c"], documents=["prices", "people", "plans"],
+                 metadatas=[{"source": "p.pdf"}, {"source": "t.pdf"}, {"source": "q.pdf"}],
+                 embeddings=[[1.0, 0.0], [0.0, 1.0], [0.8, 0.6]])
+    store.save()
+    bump_version(str(tmp_path))
+
+    r = agent.Retriever(str(tmp_path), backend="numpy")
+    assert r.search_many(["pricing?", "team"], k=2) == [
+        [{"text": "prices", "source": "p.pdf"}, {"text": "plans", "source": "q.pdf"}],
+        [{"text": "people", "source": "t.pdf"}, {"text": "plans", "source": "q.pdf"}],
+    ]
+
+    store.delete(ids=["a"]); store.save(); bump_version(str(tmp_path))
+    assert r.search("pricing", k=1) == [{"text": "plans", "source": "q.pdf"}]
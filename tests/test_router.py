@@ -0,0 +1,43 @@
+import numpy as np
+from router import Router, rule_route
+
+def test_rules_pick_obvious_tools():
+    assert rule_route("What is (12.5 * 4) / 2?")["args"] == "(12.5 * 4) / 2"
+    assert rule_route("calculate 3 x 7") == {"tool": "calc", "args": "3 * 7", "reason": "arithmetic expression"}
+    assert rule_route("summarize https://example.com/pricing.")["args"] == "https://example.com/pricing"
+    assert rule_route("Hello there!")["tool"] == "none"
+    assert rule_route("What happened in France in 2020-2021?") is None
+    assert rule_route("compare https://a.com and https://b.com") is None
+
+class BagOfWords:
+    vocab = ["docs", "manual", "capital", "history", "poem", "joke"]
+    def encode(self, texts, **kwargs):
+        v = np.array([[t.lower().count(w) for w in self.vocab] for t in texts], dtype=np.float32) + 1e-3
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+class FakeRetriever:
+    encoder = BagOfWords()
+    def embed_query(self, query):
+        return self.encoder.encode([query])[0]
+
+def test_embedding_route_and_planner_fallback():
+    router = Router(exemplars={"vector_search": ["our docs", "the manual"], "wiki": ["capital city", "history of"],
+                               "none": ["a poem", "a joke"]}, log=lambda _: None, use_embeddings=True)
+    planned = []
+    fallback = lambda q: planned.append(q) or {"tool": "wiki", "args": q, "reason": "planner"}
+
+    decision = router.route("What does the manual say?", FakeRetriever(), fallback)
+    assert (decision["tool"], decision["route"]) == ("vector_search", "embedding") and planned == []
+    decision = router.route("Is the manual a joke?", FakeRetriever(), fallback)  # tied: ask the planner
+    assert (decision["tool"], decision["route"]) == ("wiki", "planner") and planned == ["Is the manual a joke?"]
+    assert router.route("7 * 6", FakeRetriever(), fallback)["route"] == "rule"
+
+def test_classifier_is_opt_in_and_encoder_failures_fall_back_to_the_planner():
+    fallback = lambda q: {"tool": "none", "args": "", "reason": "planner"}
+    decision = Router(log=lambda _: None).route("What does the manual say?", FakeRetriever(), fallback)
+    assert decision["route"] == "planner"
+
+    class Broken(FakeRetriever):
+        def embed_query(self, query): raise RuntimeError("model not downloaded")
+    decision = Router(log=lambda _: None, use_embeddings=True).route("What does the manual say?", Broken(), fallback)
+    assert decision["route"] == "planner" and "model not downloaded" in decision["reason"]
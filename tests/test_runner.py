@@ -0,0 +1,18 @@
+import threading
+from monitoring.runner import MonitorRunner, format_event
+
+def test_second_start_follows_the_active_run():
+    release = threading.Event()
+    def fake_run(on_event, model_name):
+        on_event({"type": "start", "total": 1, "model": model_name})
+        release.wait()
+        on_event({"type": "done", "changes": 0, "seconds": 0.1})
+
+    runner = MonitorRunner(fake_run)
+    assert runner.start(model_name="phi3")
+    assert not runner.start(model_name="mistral:7b")
+    release.set()
+    events = list(runner.follow())
+    assert [e["type"] for e in events] == ["start", "done"]
+    assert [format_event(e) for e in events][0] == "🏃 Checking 1 page(s) with model phi3..."
+    assert runner.start(model_name="phi3")
@@ -0,0 +1,18 @@
+from monitoring.sections import fingerprints, diff_sections, format_section_diff
+
+def test_diff_sections_reports_only_changed_blocks():
+    old = ["Pricing", "Free plan", "Pro plan $8", "Enterprise"]
+    new = ["Pricing", "Free plan", "Pro plan $10", "Enterprise", "New AI add-on"]
+    hunks = diff_sections(fingerprints("\n".join(old)), fingerprints("\n".join(new)))
+    assert hunks == [
+        {"anchor": 1, "removed": [2], "added": [2]},
+        {"anchor": 3, "removed": [], "added": [4]},
+    ]
+    report = format_section_diff(hunks, old, new)
+    assert "- Pro plan $8" in report and "+ Pro plan $10" in report and "+ New AI add-on" in report
+    assert "Free plan" not in report.replace("@@ after: Free plan @@", "")
+
+def test_diff_sections_ignores_unchanged_pages():
+    fps = fingerprints("a\nb\nc\nb")
+    assert diff_sections(fps, fps) == []
+    assert diff_sections([], fingerprints("a")) == [{"anchor": -1, "removed": [], "added": [0]}]
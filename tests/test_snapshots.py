@@ -0,0 +1,18 @@
+from monitoring.snapshots import SnapshotStore
+
+def test_snapshot_store_dedupes_and_keeps_history(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    h1 = store.put("Acme_Pricing", "v1", {"etag": "a"})
+    h2 = store.put("Acme_Pricing", "v2")
+    store.put("Acme_Homepage", "v1")
+    reopened = SnapshotStore(str(tmp_path))
+    assert reopened.latest_hash("Acme_Pricing") == h2
+    assert reopened.load_text(h1) == "v1"
+    assert [v["hash"] for v in reopened.history("Acme_Pricing")] == [h1, h2]
+    assert reopened.validators("Acme_Pricing") == {"etag": "a"}
+    assert len(list((tmp_path / "objects").rglob("*.gz"))) == 2
+
+def test_snapshot_store_imports_legacy_text_files(tmp_path):
+    (tmp_path / "Acme_Homepage.txt").write_text("old page", encoding="utf-8")
+    store = SnapshotStore(str(tmp_path))
+    assert store.load_text(store.latest_hash("Acme_Homepage")) == "old page"
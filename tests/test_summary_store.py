@@ -0,0 +1,22 @@
+import json
+from monitoring.summary_store import SummaryStore
+
+def test_latest_per_competitor_and_since(tmp_path):
+    with SummaryStore(str(tmp_path / "s.db")) as store:
+        store.add("Acme_Pricing", {"change_detected": True, "change_title": "old"}, "2026-01-01T00:00:00+00:00")
+        store.add("Acme_Pricing", {"change_detected": True, "change_title": "new"}, "2026-02-01T00:00:00+00:00")
+        store.add("Acme_Pricing", {"change_detected": False}, "2026-03-01T00:00:00+00:00")
+        store.add("Beta_Homepage", {"change_detected": True, "change_title": "b", "change_category": "Pricing Change"},
+                  "2026-02-15T00:00:00+00:00")
+        latest = store.latest_per_competitor()
+        assert {k: v["change_title"] for k, v in latest.items()} == {"Acme_Pricing": "new", "Beta_Homepage": "b"}
+        assert [e["competitor"] for e in store.since("2026-02-10")] == ["Beta_Homepage", "Acme_Pricing"]
+        assert len(store.since("2026-01-01", category="Pricing Change")) == 1
+
+def test_import_jsonl_is_idempotent(tmp_path):
+    log = tmp_path / "summary_log.jsonl"
+    log.write_text("\n".join(json.dumps({"timestamp": f"2026-01-0{i}", "competitor": "Acme_Pricing",
+                                         "summary": {"change_detected": True}}) for i in range(1, 4)) + "\nnot json\n")
+    with SummaryStore(str(tmp_path / "s.db")) as store:
+        assert store.import_jsonl(str(log)) == 3
+        assert store.import_jsonl(str(log)) == 0
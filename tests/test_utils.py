@@ -0,0 +1,21 @@
+from rag.utils import chunk_text, iter_chunks
+
+def test_iter_chunks_matches_chunk_text_and_tracks_pages():
+    pages = [(1, "a" * 500), (2, ""), (3, "b" * 900), (4, "c" * 30)]
+    chunks = list(iter_chunks(pages, max_chars=400, overlap=50))
+    joined = " ".join(text for _, text in pages if text)
+    assert [c for c, _, _ in chunks] == chunk_text(joined, 400, 50)
+    assert chunks[0][1:] == (1, 1)
+    assert chunks[1][1:] == (1, 3)
+    assert chunks[-1][1:] == (3, 4)
+
+def test_sentence_chunks_respect_boundaries_and_token_budget():
+    text = "The cat sat on the mat. The dog ran away quickly! Birds sing.\n\nA new paragraph starts here. It ends."
+    count = lambda s: len(s.split())
+    chunks = list(iter_chunks([(1, text)], max_chars=60, overlap=20, boundary="sentence", max_tokens=8, count_tokens=count))
+    assert all(c.endswith((".", "!")) and len(c) <= 60 and count(c) <= 8 for c, _, _ in chunks)
+    assert chunks[0][0] == "The cat sat on the mat."
+    assert chunks[2][0] == "Birds sing. A new paragraph starts here."  # carries the previous sentence as overlap
+
+    paragraphs = [c for c, _, _ in iter_chunks([(1, text)], max_chars=70, overlap=0, boundary="paragraph")]
+    assert paragraphs == ["The cat sat on the mat. The dog ran away quickly! Birds sing.", "A new paragraph starts here. It ends."]
@@ -0,0 +1,65 @@
+import numpy as np
+from rag.vectors import VectorStore, quantize, dequantize, recall_at_k
+
+def _unit(n, dim=64, seed=0):
+    v = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+def test_quantized_vectors_keep_recall():
+    emb = _unit(500)
+    m16, _ = quantize(emb, "float16")
+    m8, scales = quantize(emb, "int8")
+    assert m16.nbytes == emb.nbytes // 2 and m8.nbytes == emb.nbytes // 4
+    assert recall_at_k(emb, dequantize(m16, None)) > 0.99
+    assert recall_at_k(emb, dequantize(m8, scales)) > 0.95
+
+def test_vector_store_upsert_delete_and_convert(tmp_path):
+    emb = _unit(3)
+    store = VectorStore(str(tmp_path), dtype="int8")
+    store.upsert(ids=["a", "b"], documents=["ta", "tb"], metadatas=[{"source": "s1"}, {"source": "s2"}], embeddings=emb[:2])
+    store.save()
+
+    store = VectorStore(str(tmp_path))
+    assert store.dtype == "int8" and store.count() == 2
+    store.delete(where={"source": "s1"})
+    store.upsert(ids=["c"], documents=["tc"], metadatas=[{"source": "s3"}], embeddings=emb[2:])
+    store.save()
+
+    store = VectorStore(str(tmp_path), dtype="float16")
+    store.save()
+    store = VectorStore(str(tmp_path))
+    assert [r["id"] for r in store.rows] == ["b", "c"] and store.matrix.dtype == np.float16
+    assert np.allclose(np.asarray(store.matrix, dtype=np.float32), emb[1:], atol=1e-2)
+
+def test_recall_uses_noised_or_held_out_queries():
+    emb = _unit(300)
+    shuffled = emb[np.random.default_rng(1).permutation(300)]  # same rows, other positions: nothing in common by index
+    assert recall_at_k(emb, shuffled) < 0.2
+    assert recall_at_k(emb, emb, queries=_unit(20, seed=2)) == 1.0
+
+def test_vector_store_save_appends_and_compacts(tmp_path):
+    from rag.vectors import VectorIndex
+    emb = _unit(12)
+    store = VectorStore(str(tmp_path), dtype="int8")
+    store.upsert(ids=[str(i) for i in range(10)], documents=["t"] * 10, metadatas=[{"source": "s"}] * 10,
+                 embeddings=emb[:10])
+    store.save()
+    matrix_path = tmp_path / "matrix.npy"
+    before = matrix_path.read_bytes()
+
+    store = VectorStore(str(tmp_path))
+    store.delete(ids=["3"])
+    store.upsert(ids=["10"], documents=["t"], metadatas=[{"source": "s"}], embeddings=emb[10:11])
+    store.save()
+    after = matrix_path.read_bytes()
+    assert len(after) == len(before) + emb.shape[1] and after[128:len(before)] == before[128:]  # old rows untouched
+    store = VectorStore(str(tmp_path))
+    assert len(store.rows) == 11 and store.dead == {3} and store.count() == 10
+    index = VectorIndex(str(tmp_path))
+    assert len(index) == 10 and "3" not in {r["id"] for r in index.rows}
+    assert index.search(emb[10], k=1)[0][0] == [r["id"] for r in index.rows].index("10")
+
+    store.delete(ids=["0", "1", "2"])  # over COMPACT_RATIO dead: rewritten without tombstones
+    store.save()
+    store = VectorStore(str(tmp_path))
+    assert len(store.rows) == 7 and store.dead == set() and len(store.matrix) == 7